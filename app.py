@@ -1,7 +1,18 @@
 from flask import Flask
-from extensions import db, bcrypt, mail  # Add mail import
-from auth.routes import auth_bp
+from extensions import db, migrate, bcrypt, mail, jwt, oauth, feed_cache, hasher, limiter, last_logins, view_counter, user_cache, markdown_renderer  # Add mail import
+from auth.routes import auth_bp, init_oauth
 from blog.routes import blog_bp
+from querycount import init_query_budget
+from instrumentation import init_instrumentation
+from json_provider import init_json
+from database import engine_options, init_read_routing, REPLICA_BIND
+from sessions import init_sessions
+from templating import init_templates, templates_cli
+from compression import init_compression
+from assets import init_assets, assets_cli
+from outbox import outbox_cli
+from blog.bulk import bulk_cli
+from rendering import markdown_cli
 import os
 from dotenv import load_dotenv
 
@@ -17,6 +28,20 @@ def create_app():
     app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+    # Connection pool (size/overflow are ignored for SQLite); statement timeout is PostgreSQL-only
+    app.config["DB_POOL_SIZE"] = int(os.getenv("DB_POOL_SIZE", 5))
+    app.config["DB_MAX_OVERFLOW"] = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    app.config["DB_POOL_TIMEOUT"] = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    app.config["DB_POOL_RECYCLE"] = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    app.config["DB_POOL_PRE_PING"] = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+    app.config["DB_STATEMENT_TIMEOUT_MS"] = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+    app.config["DB_REPLICA_STICKY_SECONDS"] = int(os.getenv("DB_REPLICA_STICKY_SECONDS", 5))
+    if database_uri:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(database_uri, app.config)
+    replica_uri = os.getenv("DATABASE_REPLICA_URI")
+    if replica_uri:
+        app.config["SQLALCHEMY_BINDS"] = {REPLICA_BIND: {"url": replica_uri, **engine_options(replica_uri, app.config)}}
+
     # SMTP Configuration
     app.config["MAIL_SERVER"] = "smtp.gmail.com"
     app.config["MAIL_PORT"] = 587
@@ -24,6 +49,13 @@ def create_app():
     app.config["MAIL_USERNAME"] = os.getenv("MAIL_USERNAME")  
     app.config["MAIL_PASSWORD"] = os.getenv("MAIL_PASSWORD")  
     app.config["MAIL_DEFAULT_SENDER"] = os.getenv("MAIL_DEFAULT_SENDER")
+
+    # Outbox worker: batch size per SMTP connection and retry backoff (seconds)
+    app.config["MAIL_OUTBOX_BATCH_SIZE"] = int(os.getenv("MAIL_OUTBOX_BATCH_SIZE", 50))
+    app.config["MAIL_OUTBOX_MAX_ATTEMPTS"] = int(os.getenv("MAIL_OUTBOX_MAX_ATTEMPTS", 8))
+    app.config["MAIL_OUTBOX_RETRY_BASE"] = int(os.getenv("MAIL_OUTBOX_RETRY_BASE", 30))
+    app.config["MAIL_OUTBOX_RETRY_MAX"] = int(os.getenv("MAIL_OUTBOX_RETRY_MAX", 3600))
+    app.config["MAIL_OUTBOX_POLL_INTERVAL"] = float(os.getenv("MAIL_OUTBOX_POLL_INTERVAL", 5))
     
     # JWT Configuration
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
@@ -32,22 +64,140 @@ def create_app():
     # Google OAuth Configuration
     app.config["GOOGLE_CLIENT_ID"] = os.getenv("GOOGLE_CLIENT_ID")
     app.config["GOOGLE_CLIENT_SECRET"] = os.getenv("GOOGLE_CLIENT_SECRET")
+    app.config["GOOGLE_METADATA_TTL"] = int(os.getenv("GOOGLE_METADATA_TTL", 3600))
+    app.config["GOOGLE_METADATA_CACHE_PATH"] = os.getenv("GOOGLE_METADATA_CACHE_PATH")
+
+    # Password hashing pool (HASHING_POOL_SIZE=0 hashes inline in the request thread)
+    app.config["BCRYPT_LOG_ROUNDS"] = int(os.getenv("BCRYPT_LOG_ROUNDS", 12))
+    app.config["HASHING_POOL_SIZE"] = int(os.getenv("HASHING_POOL_SIZE", os.cpu_count() or 1))
+    app.config["HASHING_MAX_PENDING"] = int(os.getenv("HASHING_MAX_PENDING", 0)) or None
+    app.config["HASHING_TIMEOUT"] = float(os.getenv("HASHING_TIMEOUT", 5))
+    app.config["HASHING_RETRY_AFTER"] = int(os.getenv("HASHING_RETRY_AFTER", 1))
+
+    # Pagination
+    app.config["POSTS_PER_PAGE"] = int(os.getenv("POSTS_PER_PAGE", 20))
+    app.config["MAX_POSTS_PER_PAGE"] = int(os.getenv("MAX_POSTS_PER_PAGE", 100))
+    app.config["COMMENTS_PER_PAGE"] = int(os.getenv("COMMENTS_PER_PAGE", 20))
+    app.config["SEARCH_MAX_PAGE"] = int(os.getenv("SEARCH_MAX_PAGE", 50))
+    # Rows per executemany/commit for bulk imports and per fetch for NDJSON exports
+    app.config["BULK_BATCH_SIZE"] = int(os.getenv("BULK_BATCH_SIZE", 1000))
+    # Streamed JSON listings (?stream=1)
+    app.config["JSON_PROVIDER"] = os.getenv("JSON_PROVIDER", "orjson")
+    app.config["JSON_STREAM_CHUNK_SIZE"] = int(os.getenv("JSON_STREAM_CHUNK_SIZE", 100))
+    app.config["MAX_STREAMED_POSTS_PER_PAGE"] = int(os.getenv("MAX_STREAMED_POSTS_PER_PAGE", 1000))
+
+    # Feed cache ("simple" in-process LRU, "redis" shared, "null" disabled)
+    app.config["CACHE_TYPE"] = os.getenv("CACHE_TYPE", "simple")
+    app.config["CACHE_DEFAULT_TIMEOUT"] = int(os.getenv("CACHE_DEFAULT_TIMEOUT", 60))
+    app.config["CACHE_MAX_ENTRIES"] = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+    app.config["CACHE_REDIS_URL"] = os.getenv("CACHE_REDIS_URL")
+
+    # Import flask_mail, authlib and Flask-Migrate on first use instead of at startup
+    app.config["LAZY_EXTENSIONS"] = os.getenv("LAZY_EXTENSIONS", "1") == "1"
+
+    # Compiled template bytecode shared by workers and restarts
+    app.config["JINJA_BYTECODE_CACHE"] = os.getenv("JINJA_BYTECODE_CACHE", "1") == "1"
+    app.config["JINJA_BYTECODE_CACHE_DIR"] = os.getenv("JINJA_BYTECODE_CACHE_DIR")
+
+    # Server-side sessions ("sqlite" file in instance/, "redis" shared, "cookie" signed cookie)
+    app.config["SESSION_STORE"] = os.getenv("SESSION_STORE", "sqlite")
+    app.config["SESSION_SQLITE_PATH"] = os.getenv("SESSION_SQLITE_PATH")
+    app.config["SESSION_REDIS_URL"] = os.getenv("SESSION_REDIS_URL", app.config["CACHE_REDIS_URL"])
+    # Per-process cache of User.to_dict() (seconds, 0 = off)
+    app.config["USER_CACHE_TIMEOUT"] = int(os.getenv("USER_CACHE_TIMEOUT", 30))
+
+    # last_login updates are buffered and flushed in batches (0 = update on every login)
+    app.config["LAST_LOGIN_WRITE_BEHIND"] = os.getenv("LAST_LOGIN_WRITE_BEHIND", "1") == "1"
+    app.config["LAST_LOGIN_FLUSH_INTERVAL"] = float(os.getenv("LAST_LOGIN_FLUSH_INTERVAL", 10))
+
+    # View counts (flushed per worker in batches) and the trending ranking
+    app.config["VIEW_FLUSH_INTERVAL"] = float(os.getenv("VIEW_FLUSH_INTERVAL", 10))
+    app.config["TRENDING_WINDOW_HOURS"] = int(os.getenv("TRENDING_WINDOW_HOURS", 48))
+    app.config["TRENDING_HALF_LIFE_HOURS"] = float(os.getenv("TRENDING_HALF_LIFE_HOURS", 6))
+    app.config["TRENDING_SIZE"] = int(os.getenv("TRENDING_SIZE", 50))
+
+    # Home timelines: posts are copied to followers on write, except for authors
+    # with more followers than this, whose posts are merged in on read
+    app.config["FANOUT_MAX_FOLLOWERS"] = int(os.getenv("FANOUT_MAX_FOLLOWERS", 10000))
+    app.config["TIMELINE_BACKFILL"] = int(os.getenv("TIMELINE_BACKFILL", 50))
+
+    # Markdown renderings kept per process, keyed by content hash
+    app.config["MARKDOWN_CACHE_SIZE"] = int(os.getenv("MARKDOWN_CACHE_SIZE", 1024))
+
+    # Response compression (brotli when installed, else gzip); levels are per request, so keep them low
+    app.config["COMPRESS_ENABLED"] = os.getenv("COMPRESS_ENABLED", "1") == "1"
+    app.config["COMPRESS_MIN_SIZE"] = int(os.getenv("COMPRESS_MIN_SIZE", 500))
+    app.config["COMPRESS_LEVEL"] = int(os.getenv("COMPRESS_LEVEL", 6))
+    app.config["COMPRESS_BR_QUALITY"] = int(os.getenv("COMPRESS_BR_QUALITY", 4))
+
+    # Rate limiting (memory is per worker; use redis to share counters)
+    app.config["RATELIMIT_ENABLED"] = os.getenv("RATELIMIT_ENABLED", "1") == "1"
+    app.config["RATELIMIT_STORAGE"] = os.getenv("RATELIMIT_STORAGE", "memory")
+    app.config["RATELIMIT_REDIS_URL"] = os.getenv("RATELIMIT_REDIS_URL", app.config["CACHE_REDIS_URL"])
+    # Reverse proxies (nginx, a load balancer) in front of gunicorn; per-IP limits key on
+    # the client address they add to X-Forwarded-For instead of the proxy's own
+    app.config["RATELIMIT_TRUSTED_PROXIES"] = int(os.getenv("RATELIMIT_TRUSTED_PROXIES", 0))
+
+    # Instrumentation: /metrics endpoint and optional slow-request profiles
+    app.config["INSTRUMENTATION_ENABLED"] = os.getenv("INSTRUMENTATION_ENABLED", "0") == "1"
+    app.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN")
+    app.config["PROFILE_SLOW_REQUESTS_MS"] = int(os.getenv("PROFILE_SLOW_REQUESTS_MS", 0))
+    app.config["PROFILE_DIR"] = os.getenv("PROFILE_DIR")
+    app.config["PROFILER"] = os.getenv("PROFILER", "cprofile")
+
+    # Fail requests that exceed their query budget (set in tests to catch N+1 loads)
+    app.config["QUERY_BUDGET"] = int(os.getenv("QUERY_BUDGET", 0))
 
     # Init extensions
     db.init_app(app)
+    migrate.init_app(app, db)
     bcrypt.init_app(app)
     mail.init_app(app)  # Add this line!
+    jwt.init_app(app)
+    feed_cache.init_app(app)
+    hasher.init_app(app)
+    limiter.init_app(app)
+    last_logins.init_app(app)
+    view_counter.init_app(app)
+    markdown_renderer.init_app(app)
+    user_cache.init_app(app)
+    init_sessions(app)
+    init_templates(app)
+    init_oauth(app)
+    init_json(app)
 
     # Blueprints
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(blog_bp)
 
-    with app.app_context():
-        db.create_all()
+    init_read_routing(app)
+    init_query_budget(app)
+    init_instrumentation(app)
+    init_compression(app)
+    init_assets(app)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(bulk_cli)
+    app.cli.add_command(templates_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(markdown_cli)
 
+    # Schema is managed by Alembic: run `flask db upgrade` on deploy, so
+    # Flask-Migrate (and Alembic) are only loaded for CLI commands
+    if not app.config["LAZY_EXTENSIONS"] or os.getenv("FLASK_RUN_FROM_CLI"):
+        migrate.load()
+    if not app.config["LAZY_EXTENSIONS"]:
+        mail.load()
+        oauth.load()
     return app
 
-app = create_app()
+def __getattr__(name):
+    # Build the app on first access to `app.app` (gunicorn app:app, flask --app app)
+    # rather than as a side effect of importing this module
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import AppGroup, with_appcontext
+from compression import COMPRESSIBLE_MIMETYPES, available_encodings, compress
+
+assets_cli = AppGroup("assets", help="Static asset build helpers.")
+
+BUILD_DIR = "dist"
+MANIFEST = "manifest.json"
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+ONE_YEAR = 365 * 24 * 3600
+
+def _fingerprint(name, data):
+    root, ext = os.path.splitext(name)
+    return f"{BUILD_DIR}/{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+def build_assets(static_folder, min_size=0):
+    """Copy every static file into static/dist under a content-hashed name.
+
+    Compressible files also get .br/.gz siblings at maximum compression.
+    Writes and returns the manifest mapping source names to hashed names.
+    """
+    out_dir = os.path.join(static_folder, BUILD_DIR)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    manifest = {}
+    for dirpath, dirnames, filenames in os.walk(static_folder):
+        if dirpath == static_folder and BUILD_DIR in dirnames:
+            dirnames.remove(BUILD_DIR)
+        for filename in filenames:
+            source = os.path.join(dirpath, filename)
+            name = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+            target = _fingerprint(name, data)
+            path = os.path.join(static_folder, *target.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+            if mimetypes.guess_type(name)[0] in COMPRESSIBLE_MIMETYPES and len(data) >= min_size:
+                for encoding in available_encodings():
+                    compressed = compress(data, encoding)
+                    if len(compressed) < len(data):
+                        with open(path + SUFFIXES[encoding], "wb") as f:
+                            f.write(compressed)
+            manifest[name] = target
+
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+def _send_fingerprinted(folder, filename):
+    # Precompressed variants may exist even if brotli isn't installed here
+    for encoding, suffix in SUFFIXES.items():
+        if request.accept_encodings[encoding] > 0 and os.path.isfile(os.path.join(folder, filename + suffix)):
+            response = send_from_directory(folder, filename + suffix, max_age=ONE_YEAR,
+                                           mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+            response.headers["Content-Encoding"] = encoding
+            break
+    else:
+        response = send_from_directory(folder, filename, max_age=ONE_YEAR)
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+def init_assets(app):
+    """Point url_for('static', ...) at fingerprinted files once `flask assets build` has run.
+
+    Hashed names change with their content, so they are served with a
+    one-year immutable Cache-Control (and .br/.gz variants when the client
+    accepts them). Without a manifest static files are served as before.
+    """
+    try:
+        with open(os.path.join(app.static_folder, BUILD_DIR, MANIFEST)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return
+    fingerprinted = set(manifest.values())
+    app.extensions["assets"] = manifest
+
+    @app.url_defaults
+    def fingerprint_static_url(endpoint, values):
+        if endpoint == "static" and values.get("filename") in manifest:
+            values["filename"] = manifest[values["filename"]]
+
+    send_static = app.view_functions["static"]
+
+    def static(filename):
+        if filename in fingerprinted:
+            return _send_fingerprinted(app.static_folder, filename)
+        return send_static(filename=filename)
+
+    app.view_functions["static"] = static
+
+@assets_cli.command("build")
+@with_appcontext
+def build_assets_command():
+    """Fingerprint and precompress everything under static/."""
+    manifest = build_assets(current_app.static_folder, current_app.config.get("COMPRESS_MIN_SIZE", 0))
+    click.echo(f"Fingerprinted {len(manifest)} file(s) into static/{BUILD_DIR}.")
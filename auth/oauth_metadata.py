@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+import time
+
+class OpenIDMetadataCache:
+    """Keeps an OAuth client's discovery document and JWKS warm.
+
+    The documents are fetched at most once per ttl and written to disk, so a
+    restarted worker (or a provider outage) falls back to the last good copy
+    instead of blocking the login on an external round trip.
+    """
+
+    def __init__(self, metadata_url, cache_path, ttl=3600, retry_after=60, timeout=5):
+        self.metadata_url = metadata_url
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.timeout = timeout
+        self._next_attempt = 0
+        self._lock = threading.Lock()
+
+    def _fetch(self):
+        import requests
+        resp = requests.get(self.metadata_url, timeout=self.timeout)
+        resp.raise_for_status()
+        metadata = resp.json()
+        jwks = requests.get(metadata["jwks_uri"], timeout=self.timeout)
+        jwks.raise_for_status()
+        metadata["jwks"] = jwks.json()
+        metadata["_loaded_at"] = time.time()
+        return metadata
+
+    def _read_disk(self):
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, metadata):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _install(self, client, metadata):
+        client.server_metadata.clear()
+        client.server_metadata.update(metadata)
+
+    def _is_fresh(self, metadata):
+        return bool(metadata) and time.time() - metadata.get("_loaded_at", 0) < self.ttl
+
+    def ensure_fresh(self, client):
+        """Make sure client.server_metadata holds a usable, unexpired copy"""
+        if self._is_fresh(client.server_metadata):
+            return client
+        with self._lock:
+            if self._is_fresh(client.server_metadata):
+                return client
+
+            # A fresh copy written by another worker saves us the fetch
+            cached = self._read_disk()
+            if self._is_fresh(cached):
+                self._install(client, cached)
+                return client
+
+            if time.time() >= self._next_attempt:
+                # Imported here so workers that never see a Google login don't pay for it
+                import requests
+                try:
+                    metadata = self._fetch()
+                except (requests.RequestException, KeyError, ValueError):
+                    self._next_attempt = time.time() + self.retry_after
+                else:
+                    self._install(client, metadata)
+                    self._write_disk(metadata)
+                    return client
+
+            # Provider unreachable: serve the stale copy rather than failing logins
+            if "jwks" not in client.server_metadata and cached:
+                self._install(client, cached)
+            if "jwks" not in client.server_metadata:
+                raise RuntimeError("OpenID provider metadata is unavailable")
+            return client
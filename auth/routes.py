@@ -1,42 +1,78 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, jsonify
-from extensions import db, bcrypt, mail, oauth
+from extensions import db, hasher, oauth, last_logins, user_cache
 from models import User
-from flask_mail import Message
+from hashing import HashingBusy
+from outbox import enqueue_email
+from auth.oauth_metadata import OpenIDMetadataCache
+from database import read_replica
+from ratelimit import rate_limit
+from sessions import regenerate_session
 from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from datetime import datetime
+import os
 import secrets
-import requests
 
 auth_bp = Blueprint("auth", __name__, template_folder="../templates")
 
-# Configure Google OAuth
+GOOGLE_METADATA_URL = 'https://accounts.google.com/.well-known/openid-configuration'
+
+# Configure Google OAuth (called once from create_app)
 def init_oauth(app):
+    # authlib is imported and the client registered on the first Google login
     oauth.init_app(app)
-    google = oauth.register(
-        name='google',
-        client_id=app.config['GOOGLE_CLIENT_ID'],
-        client_secret=app.config['GOOGLE_CLIENT_SECRET'],
-        server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-        client_kwargs={
-            'scope': 'openid email profile'
-        }
+    app.extensions["google_metadata"] = OpenIDMetadataCache(
+        GOOGLE_METADATA_URL,
+        app.config.get("GOOGLE_METADATA_CACHE_PATH")
+            or os.path.join(app.instance_path, "google_openid_metadata.json"),
+        ttl=app.config.get("GOOGLE_METADATA_TTL", 3600),
     )
-    return google
+
+def get_google_client():
+    """Registered Google client with discovery metadata and JWKS preloaded"""
+    google = oauth.create_client('google')
+    if google is None:
+        google = oauth.register(
+            name='google',
+            client_id=current_app.config['GOOGLE_CLIENT_ID'],
+            client_secret=current_app.config['GOOGLE_CLIENT_SECRET'],
+            server_metadata_url=GOOGLE_METADATA_URL,
+            client_kwargs={
+                'scope': 'openid email profile'
+            }
+        )
+    return current_app.extensions["google_metadata"].ensure_fresh(google)
+
+# Hashing pool saturated: shed load instead of queueing behind other logins
+HASHING_BUSY_TEMPLATES = {
+    "auth.signup": "signup.html",
+    "auth.login": "login.html",
+    "auth.reset_password": "reset_password.html",
+}
+
+@auth_bp.errorhandler(HashingBusy)
+def handle_hashing_busy(e):
+    headers = {"Retry-After": str(e.retry_after)}
+    if request.path.startswith("/auth/api/"):
+        return jsonify({'error': 'Server busy, please retry shortly'}), 503, headers
+    flash("We're handling a lot of sign-ins right now. Please try again in a moment.", "warning")
+    template = HASHING_BUSY_TEMPLATES.get(request.endpoint, "login.html")
+    return render_template(template, **request.view_args), 503, headers
+
+def submitted_email():
+    """Email from the login/reset form or JSON body, so guessing is limited per account"""
+    data = request.get_json(silent=True) if request.is_json else request.form
+    email = (data or {}).get("email")
+    return email.strip().lower() if isinstance(email, str) else None
 
 # Serializer for generating/validating tokens
 def generate_serializer():
     secret_key = current_app.config["SECRET_KEY"]
     return URLSafeTimedSerializer(secret_key)
 
-# Email utilities
+# Email utilities (queued in the outbox and delivered by `flask outbox worker`)
 def send_confirmation_email(user, token):
     confirm_url = url_for("auth.confirm_email", token=token, _external=True)
-    msg = Message(
-        "Confirm Your Email - Flask Blog",
-        recipients=[user.email],
-    )
-    msg.body = f"""Hello {user.name},
+    body = f"""Hello {user.name},
 
 Please confirm your email by clicking this link:
 {confirm_url}
@@ -45,15 +81,12 @@ This link will expire in 1 hour.
 
 If you didn't create this account, please ignore this email.
 """
-    mail.send(msg)
+    enqueue_email(user.email, "Confirm Your Email - Flask Blog", body)
+    db.session.commit()
 
 def send_reset_email(user, token):
     reset_url = url_for("auth.reset_password", token=token, _external=True)
-    msg = Message(
-        "Password Reset Request - Flask Blog",
-        recipients=[user.email],
-    )
-    msg.body = f"""Hello {user.name},
+    body = f"""Hello {user.name},
 
 A password reset has been requested for your account. Click the link below to reset your password:
 {reset_url}
@@ -62,9 +95,11 @@ This link will expire in 1 hour.
 
 If you didn't request this reset, please ignore this email.
 """
-    mail.send(msg)
+    enqueue_email(user.email, "Password Reset Request - Flask Blog", body)
+    db.session.commit()
 
 @auth_bp.route("/signup", methods=["GET", "POST"])
+@rate_limit("5/hour", methods=["POST"])
 def signup():
     if request.method == "POST":
         name = request.form["name"].strip()
@@ -87,7 +122,7 @@ def signup():
             return redirect(url_for("auth.login"))
 
         # Create user
-        hashed_pw = bcrypt.generate_password_hash(password).decode("utf-8")
+        hashed_pw = hasher.generate_password_hash(password)
         new_user = User(name=name, email=email, password=hashed_pw)
         db.session.add(new_user)
         db.session.commit()
@@ -130,6 +165,8 @@ def confirm_email(token):
     return redirect(url_for("auth.login"))
 
 @auth_bp.route("/login", methods=["GET", "POST"])
+@rate_limit("10/minute", "100/hour", methods=["POST"])
+@rate_limit("5/minute", scope=submitted_email, methods=["POST"])
 def login():
     if request.method == "POST":
         email = request.form["email"].strip().lower()
@@ -138,16 +175,20 @@ def login():
 
         user = User.query.filter_by(email=email).first()
 
-        if user and user.password and bcrypt.check_password_hash(user.password, password):
+        if user and user.password and hasher.check_password_hash(user.password, password):
             if not user.confirmed:
                 flash("Please confirm your email before logging in.", "warning")
                 return redirect(url_for("auth.login"))
 
-            # Update last login
-            user.last_login = datetime.utcnow()
-            db.session.commit()
+            # Upgrade the stored hash if the work factor changed
+            if hasher.needs_rehash(user.password):
+                user.password = hasher.generate_password_hash(password)
+                db.session.commit()
+
+            last_logins.record(user)
 
-            # Set session
+            # Set session, under a new id so a pre-login id never becomes a logged-in one
+            regenerate_session(session)
             session["user_id"] = user.id
             session["user_name"] = user.name
             session["user_email"] = user.email
@@ -164,13 +205,13 @@ def login():
 # Google OAuth routes
 @auth_bp.route("/google")
 def google_login():
-    google = init_oauth(current_app)
+    google = get_google_client()
     redirect_uri = url_for("auth.google_callback", _external=True)
     return google.authorize_redirect(redirect_uri)
 
 @auth_bp.route("/google/callback")
 def google_callback():
-    google = init_oauth(current_app)
+    google = get_google_client()
     token = google.authorize_access_token()
     user_info = token.get('userinfo')
     
@@ -188,7 +229,6 @@ def google_callback():
             user.google_id = google_id
             user.avatar_url = avatar_url
             user.confirmed = True  # Google users are automatically confirmed
-            user.last_login = datetime.utcnow()
         else:
             # Create new user
             user = User(
@@ -201,8 +241,10 @@ def google_callback():
             db.session.add(user)
         
         db.session.commit()
+        last_logins.record(user)
         
-        # Set session
+        # Set session, under a new id so a pre-login id never becomes a logged-in one
+        regenerate_session(session)
         session["user_id"] = user.id
         session["user_name"] = user.name
         session["user_email"] = user.email
@@ -215,6 +257,8 @@ def google_callback():
 
 # Password Reset
 @auth_bp.route("/forgot-password", methods=["GET", "POST"])
+@rate_limit("5/hour", methods=["POST"])
+@rate_limit("3/hour", scope=submitted_email, methods=["POST"])
 def forgot_password():
     if request.method == "POST":
         email = request.form["email"].strip().lower()
@@ -236,6 +280,7 @@ def forgot_password():
     return render_template("forgot_password.html")
 
 @auth_bp.route("/reset-password/<token>", methods=["GET", "POST"])
+@rate_limit("10/hour", methods=["POST"])
 def reset_password(token):
     user = User.query.filter_by(reset_token=token).first()
     
@@ -256,7 +301,7 @@ def reset_password(token):
             return render_template("reset_password.html", token=token)
         
         # Update password
-        hashed_pw = bcrypt.generate_password_hash(password).decode("utf-8")
+        hashed_pw = hasher.generate_password_hash(password)
         user.password = hashed_pw
         user.clear_reset_token()
         
@@ -273,6 +318,8 @@ def logout():
 
 # API Routes with JWT
 @auth_bp.route("/api/login", methods=["POST"])
+@rate_limit("10/minute", "100/hour")
+@rate_limit("5/minute", scope=submitted_email)
 def api_login():
     data = request.get_json()
     
@@ -281,16 +328,19 @@ def api_login():
     
     user = User.query.filter_by(email=data['email'].lower()).first()
     
-    if user and user.password and bcrypt.check_password_hash(user.password, data['password']):
+    if user and user.password and hasher.check_password_hash(user.password, data['password']):
         if not user.confirmed:
             return jsonify({'error': 'Please confirm your email first'}), 401
         
-        # Update last login
-        user.last_login = datetime.utcnow()
-        db.session.commit()
+        # Upgrade the stored hash if the work factor changed
+        if hasher.needs_rehash(user.password):
+            user.password = hasher.generate_password_hash(data['password'])
+            db.session.commit()
+        
+        last_logins.record(user)
         
         # Generate JWT token
-        access_token = create_access_token(identity=user.id)
+        access_token = create_access_token(identity=str(user.id))
         
         return jsonify({
             'access_token': access_token,
@@ -300,6 +350,7 @@ def api_login():
     return jsonify({'error': 'Invalid credentials'}), 401
 
 @auth_bp.route("/api/register", methods=["POST"])
+@rate_limit("5/hour")
 def api_register():
     data = request.get_json()
     
@@ -316,7 +367,7 @@ def api_register():
         return jsonify({'error': 'Email already registered'}), 400
     
     # Create user
-    hashed_pw = bcrypt.generate_password_hash(data['password']).decode("utf-8")
+    hashed_pw = hasher.generate_password_hash(data['password'])
     user = User(name=data['name'], email=email, password=hashed_pw)
     db.session.add(user)
     db.session.commit()
@@ -339,12 +390,12 @@ def api_register():
         }), 201
 
 @auth_bp.route("/api/profile", methods=["GET"])
+@read_replica
 @jwt_required()
 def api_profile():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = user_cache.get(int(get_jwt_identity()))
     
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    return jsonify({'user': user.to_dict()}), 200
\ No newline at end of file
+    return jsonify({'user': user}), 200
\ No newline at end of file
@@ -0,0 +1,239 @@
+"""Seed a database and benchmark the main blog and auth endpoints.
+
+    python -m benchmarks.run --posts 10000 --comments 50000 --output bench.json
+    python -m benchmarks.run --gunicorn --workers 4 --concurrency 16
+
+Results (p50/p95/p99 latency in ms, throughput and SQL statements per
+request) are written as JSON so runs can be diffed across commits.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-uri", help="Defaults to a fresh SQLite file in a temp directory.")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--comments", type=int, default=5000)
+    parser.add_argument("--no-seed", action="store_true", help="Benchmark an already populated database.")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario.")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per scenario.")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--cache-type", default="null", help="Feed cache backend (null measures the DB path).")
+    parser.add_argument("--gunicorn", action="store_true", help="Drive a local gunicorn over HTTP.")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers with --gunicorn.")
+    parser.add_argument("--only", action="append", help="Run only the named scenario (repeatable).")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    return parser.parse_args(argv)
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(durations, statuses, queries, wall_time):
+    durations = sorted(durations)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        'requests': len(durations),
+        'p50_ms': ms(percentile(durations, 50)),
+        'p95_ms': ms(percentile(durations, 95)),
+        'p99_ms': ms(percentile(durations, 99)),
+        'mean_ms': ms(sum(durations) / len(durations)) if durations else None,
+        'throughput_rps': round(len(durations) / wall_time, 2) if wall_time else None,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'max_queries': max(queries) if queries else None,
+        'status_codes': {str(code): statuses.count(code) for code in sorted(set(statuses))},
+    }
+
+class TestClientDriver:
+    """In-process driver; also counts SQL statements per request"""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method, path, body=None):
+        from querycount import count_queries
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        with count_queries() as counter:
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            response.get_data()
+            elapsed = time.perf_counter() - start
+        return response.status_code, elapsed, counter.count
+
+class HttpDriver:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.local = threading.local()
+
+    def request(self, method, path, body=None):
+        import requests
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        start = time.perf_counter()
+        response = session.request(method, self.base_url + path, json=body, allow_redirects=False)
+        return response.status_code, time.perf_counter() - start, None
+
+def build_scenarios(emails):
+    from models import Post
+    from benchmarks.seed import BENCH_PASSWORD
+
+    busiest = (Post.query.filter_by(is_public=True)
+               .order_by(Post.comment_count.desc(), Post.id).first())
+    if busiest is None:
+        raise SystemExit("No public posts to benchmark; seed the database first.")
+    post_id = busiest.id
+    logins = iter(range(sys.maxsize))
+
+    return {
+        'home': lambda: ("GET", "/", None),
+        'post_detail': lambda: ("GET", f"/post/{post_id}", None),
+        'api_posts': lambda: ("GET", "/api/posts", None),
+        'api_comments': lambda: ("GET", f"/api/posts/{post_id}/comments", None),
+        'api_login': lambda: ("POST", "/auth/api/login",
+                              {'email': emails[next(logins) % len(emails)], 'password': BENCH_PASSWORD}),
+    }
+
+def run_scenario(driver, make_request, total, warmup, concurrency):
+    for _ in range(warmup):
+        driver.request(*make_request())
+
+    lock = threading.Lock()
+    durations, statuses, queries = [], [], []
+    remaining = [total]
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+                method, path, body = make_request()
+            status, elapsed, count = driver.request(method, path, body)
+            with lock:
+                durations.append(elapsed)
+                statuses.append(status)
+                if count is not None:
+                    queries.append(count)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(durations, statuses, queries, time.perf_counter() - start)
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_gunicorn(workers):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app:app", "--bind", f"127.0.0.1:{port}", "--workers", str(workers)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("gunicorn did not start within 30 seconds")
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    args = parse_args(argv)
+    database_uri = args.database_uri or "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="flaskblog-bench-"), "bench.db")
+    os.environ["DATABASE_URI"] = database_uri
+    os.environ["CACHE_TYPE"] = args.cache_type
+    # Every request comes from one client, which the login limits would throttle
+    os.environ["RATELIMIT_ENABLED"] = "0"
+    os.environ.setdefault("APP_SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-jwt-secret-with-enough-length")
+
+    from app import app
+    from extensions import migrate
+    from flask_migrate import upgrade
+    from benchmarks.seed import seed
+    from models import User
+
+    migrate.load()
+    with app.app_context():
+        upgrade(directory=os.path.join(app.root_path, "migrations"))
+        if args.no_seed:
+            emails = [user.email for user in User.query.filter(User.password.isnot(None)).limit(1000)]
+        else:
+            emails = seed(args.users, args.posts, args.comments)
+        scenarios = build_scenarios(emails)
+        dialect = app.extensions["sqlalchemy"].engine.dialect.name
+
+    process = None
+    if args.gunicorn:
+        process, base_url = start_gunicorn(args.workers)
+        driver = HttpDriver(base_url)
+    else:
+        driver = TestClientDriver(app)
+
+    results = {}
+    try:
+        for name, make_request in scenarios.items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = run_scenario(driver, make_request, args.requests, args.warmup, args.concurrency)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    report = {
+        'meta': {
+            'git_revision': git_revision(),
+            'timestamp': datetime.utcnow().isoformat() + "Z",
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': dialect,
+            'driver': 'gunicorn' if args.gunicorn else 'test_client',
+            'workers': args.workers if args.gunicorn else None,
+            'concurrency': args.concurrency,
+            'cache_type': args.cache_type,
+            'volumes': None if args.no_seed else {'users': args.users, 'posts': args.posts, 'comments': args.comments},
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
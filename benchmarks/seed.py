@@ -0,0 +1,68 @@
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert, text
+from extensions import db, hasher, markdown_renderer
+from models import User, Post, Comment, make_excerpt
+from blog.search import reindex_posts
+
+BENCH_PASSWORD = "benchmark-password"
+WORDS = ("flask", "python", "database", "query", "index", "cache", "latency", "worker",
+         "template", "session", "request", "response", "blog", "post", "comment", "retro")
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+def _chunks(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def seed(users=100, posts=1000, comments=5000, seed_value=42, batch_size=5000):
+    """Fill an empty schema with deterministic fake data via executemany inserts.
+
+    Every user shares one BENCH_PASSWORD hash made at the configured work
+    factor, so seeding hashes once while logins still pay the real bcrypt
+    cost (and never trigger rehash-on-login). Returns the seeded emails.
+    """
+    rng = random.Random(seed_value)
+    start = datetime(2024, 1, 1)
+    pw_hash = hasher.generate_password_hash(BENCH_PASSWORD)
+
+    emails = [f"bench{i}@example.com" for i in range(users)]
+    user_rows = [{"name": f"Bench User {i}", "email": email, "password": pw_hash,
+                  "confirmed": True, "created_at": start} for i, email in enumerate(emails)]
+    for chunk in _chunks(user_rows, batch_size):
+        db.session.execute(insert(User), chunk)
+    user_ids = [row.id for row in db.session.execute(text("SELECT id FROM \"user\" ORDER BY id"))]
+
+    post_rows = []
+    for i in range(posts):
+        content = " ".join(_sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(3, 30)))
+        ts = start + timedelta(minutes=i)
+        content_hash, content_html = markdown_renderer.render(content)
+        post_rows.append({"title": _sentence(rng, rng.randint(3, 8)), "content": content,
+                          "excerpt": make_excerpt(content), "content_hash": content_hash,
+                          "content_html": content_html, "timestamp": ts, "updated_at": ts,
+                          "user_id": rng.choice(user_ids), "is_public": rng.random() > 0.05,
+                          "comment_count": 0})
+    for chunk in _chunks(post_rows, batch_size):
+        db.session.execute(insert(Post), chunk)
+    post_ids = [row.id for row in db.session.execute(text("SELECT id FROM post ORDER BY id"))]
+
+    comment_rows = []
+    for i in range(comments):
+        ts = start + timedelta(minutes=posts + i)
+        content = _sentence(rng, rng.randint(4, 25))
+        content_hash, content_html = markdown_renderer.render(content)
+        comment_rows.append({"content": content, "content_hash": content_hash, "content_html": content_html,
+                             "timestamp": ts, "updated_at": ts, "user_id": rng.choice(user_ids),
+                             "post_id": rng.choice(post_ids)})
+    for chunk in _chunks(comment_rows, batch_size):
+        db.session.execute(insert(Comment), chunk)
+
+    db.session.execute(text(
+        "UPDATE post SET comment_count = "
+        "(SELECT count(*) FROM comment WHERE comment.post_id = post.id)"
+    ))
+    reindex_posts()
+    db.session.commit()
+    return emails
@@ -0,0 +1,113 @@
+"""Measure how long a fresh worker takes from interpreter start to serving.
+
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --runs 10 --output startup.json
+
+Each run is a new Python process that imports `app`, builds it and serves
+one request to `/`, timing every stage. Runs are repeated with lazy
+extensions on and off (LAZY_EXTENSIONS) so the two modes can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-uri", help="Defaults to a migrated SQLite file in a temp directory.")
+    parser.add_argument("--runs", type=int, default=5, help="Processes started per mode.")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def child():
+    """Runs inside the measured process; prints stage timings as JSON"""
+    start = time.perf_counter()
+    import app as app_module
+    imported = time.perf_counter()
+    app = app_module.app
+    created = time.perf_counter()
+    status = app.test_client().get("/").status_code
+    served = time.perf_counter()
+
+    ms = lambda a, b: round((b - a) * 1000, 3)
+    print(json.dumps({
+        'import_ms': ms(start, imported),
+        'create_app_ms': ms(imported, created),
+        'first_request_ms': ms(created, served),
+        'ready_ms': ms(start, served),
+        'status': status,
+        'modules_loaded': len(sys.modules),
+    }))
+
+def run_once(env):
+    start = time.perf_counter()
+    output = subprocess.check_output([sys.executable, "-m", "benchmarks.startup", "--child"], env=env,
+                                     cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), text=True)
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+def summarize(runs):
+    summary = {}
+    for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'ready_ms', 'process_ms'):
+        values = [run[key] for run in runs]
+        summary[key] = {'median': round(statistics.median(values), 3), 'min': min(values), 'max': max(values)}
+    summary['modules_loaded'] = runs[-1]['modules_loaded']
+    summary['status_codes'] = sorted({run['status'] for run in runs})
+    return summary
+
+def prepare_database(database_uri):
+    env = dict(os.environ, DATABASE_URI=database_uri)
+    env.setdefault("APP_SECRET_KEY", "benchmark-secret")
+    subprocess.check_call([sys.executable, "-m", "flask", "--app", "app", "db", "upgrade"], env=env,
+                          cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        return child()
+
+    from benchmarks.run import git_revision
+
+    database_uri = args.database_uri
+    if not database_uri:
+        database_uri = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="flaskblog-startup-"), "startup.db")
+        prepare_database(database_uri)
+
+    env = dict(os.environ, DATABASE_URI=database_uri, INSTRUMENTATION_ENABLED="0")
+    env.setdefault("APP_SECRET_KEY", "benchmark-secret")
+    env.setdefault("JWT_SECRET_KEY", "benchmark-jwt-secret-with-enough-length")
+
+    results = {}
+    for mode, lazy in (("lazy", "1"), ("eager", "0")):
+        mode_env = dict(env, LAZY_EXTENSIONS=lazy)
+        run_once(mode_env)  # warm the filesystem and .pyc caches
+        results[mode] = summarize([run_once(mode_env) for _ in range(args.runs)])
+
+    report = {
+        'meta': {
+            'git_revision': git_revision(),
+            'timestamp': datetime.utcnow().isoformat() + "Z",
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'runs': args.runs,
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+import json
+from collections import Counter
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import insert, select, update, bindparam
+from extensions import db, feed_cache, markdown_renderer
+from models import User, Post, Comment, make_excerpt
+from blog.search import reindex_posts
+from blog.timeline import fan_out_posts
+
+bulk_cli = AppGroup("bulk", help="Import and export posts and comments as NDJSON.")
+
+MAX_REPORTED_ERRORS = 100
+
+class BulkReport:
+    def __init__(self):
+        self.imported = 0
+        self.errors = []
+        self.error_count = 0
+        # Exported id -> id assigned by this import, for records that carried an id
+        self.id_map = {}
+
+    def error(self, line_no, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_no, 'error': message})
+
+    def to_dict(self):
+        return {'imported': self.imported, 'failed': self.error_count, 'errors': self.errors,
+                'id_map': {str(old): new for old, new in self.id_map.items()}}
+
+def _parse_timestamp(value):
+    if value is None:
+        return datetime.utcnow()
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None)
+
+def _required_text(record, key, max_length=None):
+    value = record.get(key)
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"'{key}' is required")
+    if max_length and len(value) > max_length:
+        raise ValueError(f"'{key}' is longer than {max_length} characters")
+    return value
+
+def _optional_bool(record, key, default):
+    value = record.get(key, default)
+    # bool("false") is True, so only real JSON booleans are accepted
+    if not isinstance(value, bool):
+        raise ValueError(f"'{key}' must be true or false")
+    return value
+
+def _records(lines, report):
+    """Yield (line_no, dict) from an NDJSON stream, reporting malformed lines"""
+    for line_no, raw in enumerate(lines, 1):
+        try:
+            if isinstance(raw, bytes):
+                raw = raw.decode("utf-8")
+            raw = raw.strip()
+            if not raw:
+                continue
+            record = json.loads(raw)
+            if not isinstance(record, dict):
+                raise ValueError("each line must be a JSON object")
+        except ValueError as e:
+            report.error(line_no, str(e))
+            continue
+        yield line_no, record
+
+def _batches(records, batch_size):
+    batch = []
+    for item in records:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _existing_ids(model, ids):
+    if not ids:
+        return set()
+    return set(db.session.scalars(select(model.id).where(model.id.in_(ids))))
+
+def _owner(record, user_id, trusted):
+    # API uploads always belong to the caller; trusted (CLI) imports keep the exported author_id
+    if not trusted:
+        return user_id
+    return record.get("author_id", record.get("user_id", user_id))
+
+def _record_id(record):
+    record_id = record.get("id")
+    return record_id if isinstance(record_id, int) else None
+
+def import_posts(lines, user_id=None, batch_size=None, trusted=False):
+    """Insert posts from NDJSON lines in batched executemany transactions.
+
+    Each batch is committed on its own so a large upload never holds one
+    long transaction; rows that fail validation are reported, not inserted.
+    Posts get new ids; report.id_map maps each record's exported id to it.
+    """
+    batch_size = batch_size or current_app.config["BULK_BATCH_SIZE"]
+    report = BulkReport()
+
+    for batch in _batches(_records(lines, report), batch_size):
+        owners = {_owner(record, user_id, trusted) for _, record in batch}
+        known_users = _existing_ids(User, [owner for owner in owners if isinstance(owner, int)])
+        rows, exported_ids = [], []
+        for line_no, record in batch:
+            try:
+                owner = _owner(record, user_id, trusted)
+                if owner not in known_users:
+                    raise ValueError("unknown author_id")
+                content = _required_text(record, "content")
+                timestamp = _parse_timestamp(record.get("timestamp"))
+                content_hash, content_html = markdown_renderer.render(content)
+                rows.append({
+                    "title": _required_text(record, "title", 200),
+                    "content": content,
+                    "excerpt": make_excerpt(content),
+                    "content_hash": content_hash,
+                    "content_html": content_html,
+                    "timestamp": timestamp,
+                    "updated_at": timestamp,
+                    "user_id": owner,
+                    "is_public": _optional_bool(record, "is_public", True),
+                    "comment_count": 0,
+                })
+                exported_ids.append(_record_id(record))
+            except (ValueError, TypeError) as e:
+                report.error(line_no, str(e))
+
+        if rows:
+            post_ids = db.session.scalars(insert(Post).returning(Post.id, sort_by_parameter_order=True),
+                                          rows).all()
+            reindex_posts(post_ids)
+            fan_out_posts(post_ids)
+            db.session.commit()
+            report.imported += len(rows)
+            report.id_map.update((old, new) for old, new in zip(exported_ids, post_ids) if old is not None)
+
+    if report.imported:
+        feed_cache.invalidate()
+    return report
+
+def _bump_counts(table, column, counts):
+    """Add per-row deltas to a counter column in one executemany UPDATE (updated_at moves too)"""
+    db.session.execute(update(table).where(table.c.id == bindparam("row_id"))
+                       .values({column: table.c[column] + bindparam("added")}),
+                       [{"row_id": row_id, "added": added} for row_id, added in counts.items()])
+
+def import_comments(lines, user_id=None, batch_size=None, trusted=False, post_id_map=None):
+    """Insert comments from NDJSON lines and bump the parent posts' comment counts.
+
+    post_ids refer to this database unless post_id_map (import_posts'
+    report.id_map) is given, which translates exported post ids. A
+    parent_id names a comment imported earlier in the same run (by its
+    exported id) or, without a post_id_map, a comment already here; the
+    parents' reply counts are bumped like the posts' comment counts.
+    """
+    batch_size = batch_size or current_app.config["BULK_BATCH_SIZE"]
+    report = BulkReport()
+    # New comment id -> post id, so replies later in the import can be checked
+    imported_posts = {}
+
+    def target_post(record):
+        post_id = record.get("post_id")
+        return post_id if post_id_map is None else post_id_map.get(post_id)
+
+    for batch in _batches(_records(lines, report), batch_size):
+        post_ids = {target_post(record) for _, record in batch}
+        query = select(Post.id).where(Post.id.in_([pid for pid in post_ids if isinstance(pid, int)]))
+        if not trusted:
+            # API uploads follow the same rule as api_create_comment
+            query = query.where(Post.is_public.is_(True))
+        known_posts = set(db.session.scalars(query))
+        owners = {_owner(record, user_id, trusted) for _, record in batch}
+        known_users = _existing_ids(User, [owner for owner in owners if isinstance(owner, int)])
+        existing_parents = {}
+        if post_id_map is None:
+            parent_ids = [record.get("parent_id") for _, record in batch]
+            parent_ids = [pid for pid in parent_ids if isinstance(pid, int) and pid not in report.id_map]
+            if parent_ids:
+                existing_parents = dict(db.session.execute(
+                    select(Comment.id, Comment.post_id).where(Comment.id.in_(parent_ids))).all())
+
+        rows, exported_ids = [], []
+        # Row index -> exported id of a parent inserted in this same batch
+        batch_parents = {}
+        batch_posts = {}
+        for line_no, record in batch:
+            try:
+                owner = _owner(record, user_id, trusted)
+                if owner not in known_users:
+                    raise ValueError("unknown author_id")
+                post_id = target_post(record)
+                if post_id not in known_posts:
+                    raise ValueError("unknown or private post_id")
+                parent = record.get("parent_id")
+                parent_id = None
+                if parent is not None:
+                    if parent in batch_posts:
+                        parent_post = batch_posts[parent]
+                    elif parent in report.id_map:
+                        parent_id = report.id_map[parent]
+                        parent_post = imported_posts[parent_id]
+                    elif parent in existing_parents:
+                        parent_id = parent
+                        parent_post = existing_parents[parent]
+                    else:
+                        raise ValueError("unknown parent_id")
+                    if parent_post != post_id:
+                        raise ValueError("parent_id is a comment on another post")
+                timestamp = _parse_timestamp(record.get("timestamp"))
+                content = _required_text(record, "content")
+                content_hash, content_html = markdown_renderer.render(content)
+                if parent is not None and parent_id is None:
+                    batch_parents[len(rows)] = parent
+                rows.append({
+                    "content": content,
+                    "content_hash": content_hash,
+                    "content_html": content_html,
+                    "timestamp": timestamp,
+                    "updated_at": timestamp,
+                    "user_id": owner,
+                    "post_id": post_id,
+                    "parent_id": parent_id,
+                    "reply_count": 0,
+                })
+                exported_ids.append(_record_id(record))
+                if exported_ids[-1] is not None:
+                    batch_posts[exported_ids[-1]] = post_id
+            except (ValueError, TypeError) as e:
+                report.error(line_no, str(e))
+
+        if rows:
+            comment_ids = db.session.scalars(
+                insert(Comment).returning(Comment.id, sort_by_parameter_order=True), rows).all()
+            for exported_id, comment_id, row in zip(exported_ids, comment_ids, rows):
+                imported_posts[comment_id] = row["post_id"]
+                if exported_id is not None:
+                    report.id_map[exported_id] = comment_id
+            if batch_parents:
+                # Parents from this batch only got their ids with the insert above
+                for index, parent in batch_parents.items():
+                    rows[index]["parent_id"] = report.id_map[parent]
+                db.session.execute(
+                    update(Comment.__table__).where(Comment.__table__.c.id == bindparam("comment_id"))
+                    .values(parent_id=bindparam("parent"), updated_at=Comment.__table__.c.updated_at),
+                    [{"comment_id": comment_ids[index], "parent": rows[index]["parent_id"]}
+                     for index in batch_parents],
+                )
+            _bump_counts(Post.__table__, "comment_count", Counter(row["post_id"] for row in rows))
+            replies = Counter(row["parent_id"] for row in rows if row["parent_id"] is not None)
+            if replies:
+                _bump_counts(Comment.__table__, "reply_count", replies)
+            db.session.commit()
+            report.imported += len(rows)
+
+    if report.imported:
+        # Feed pages show comment counts
+        feed_cache.invalidate()
+    return report
+
+def export_posts(public_only=True, user_id=None):
+    """Yield one NDJSON line per post, streamed from a server-side cursor"""
+    query = (select(Post.id, Post.title, Post.content, Post.timestamp, Post.updated_at,
+                    Post.user_id, User.name, Post.is_public, Post.comment_count)
+             .join(User, User.id == Post.user_id)
+             .order_by(Post.id)
+             .execution_options(yield_per=current_app.config["BULK_BATCH_SIZE"]))
+    if public_only:
+        query = query.where(Post.is_public.is_(True))
+    if user_id:
+        query = query.where(Post.user_id == user_id)
+
+    for row in db.session.execute(query):
+        yield json.dumps({
+            'id': row.id,
+            'title': row.title,
+            'content': row.content,
+            'timestamp': row.timestamp.isoformat() if row.timestamp else None,
+            'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+            'author': row.name,
+            'author_id': row.user_id,
+            'is_public': row.is_public,
+            'comment_count': row.comment_count,
+        }) + "\n"
+
+def export_comments(public_only=True):
+    """Yield one NDJSON line per comment, streamed from a server-side cursor"""
+    query = (select(Comment.id, Comment.content, Comment.timestamp, Comment.updated_at,
+                    Comment.user_id, User.name, Comment.post_id, Comment.parent_id, Comment.reply_count)
+             .join(User, User.id == Comment.user_id)
+             .order_by(Comment.id)
+             .execution_options(yield_per=current_app.config["BULK_BATCH_SIZE"]))
+    if public_only:
+        query = query.join(Post, Post.id == Comment.post_id).where(Post.is_public.is_(True))
+
+    for row in db.session.execute(query):
+        yield json.dumps({
+            'id': row.id,
+            'content': row.content,
+            'timestamp': row.timestamp.isoformat() if row.timestamp else None,
+            'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+            'author': row.name,
+            'author_id': row.user_id,
+            'post_id': row.post_id,
+            'parent_id': row.parent_id,
+            'reply_count': row.reply_count,
+        }) + "\n"
+
+def _echo_report(report):
+    click.echo(f"Imported {report.imported} row(s), {report.error_count} failed.")
+    for error in report.errors:
+        click.echo(f"  line {error['line']}: {error['error']}", err=True)
+
+@bulk_cli.command("import-posts")
+@click.argument("source", type=click.File("rb"), default="-")
+@click.option("--user-id", type=int, default=None, help="Owner for records without an author_id.")
+@click.option("--batch-size", type=int, default=None)
+@click.option("--id-map", type=click.File("w"), default=None,
+              help="Write a JSON map of exported post ids to new ids, for import-comments.")
+def import_posts_command(source, user_id, batch_size, id_map):
+    """Import posts from an NDJSON file (or stdin)."""
+    report = import_posts(source, user_id, batch_size, trusted=True)
+    if id_map:
+        json.dump(report.to_dict()["id_map"], id_map)
+    _echo_report(report)
+
+@bulk_cli.command("import-comments")
+@click.argument("source", type=click.File("rb"), default="-")
+@click.option("--user-id", type=int, default=None, help="Author for records without an author_id.")
+@click.option("--batch-size", type=int, default=None)
+@click.option("--post-id-map", type=click.File("r"), default=None,
+              help="JSON map written by import-posts --id-map; post_ids are translated through it.")
+def import_comments_command(source, user_id, batch_size, post_id_map):
+    """Import comments from an NDJSON file (or stdin)."""
+    if post_id_map:
+        post_id_map = {int(old): new for old, new in json.load(post_id_map).items()}
+    _echo_report(import_comments(source, user_id, batch_size, trusted=True, post_id_map=post_id_map))
+
+@bulk_cli.command("export-posts")
+@click.argument("target", type=click.File("w"), default="-")
+@click.option("--include-private", is_flag=True)
+def export_posts_command(target, include_private):
+    """Export posts as NDJSON to a file (or stdout)."""
+    for line in export_posts(public_only=not include_private):
+        target.write(line)
+
+@bulk_cli.command("export-comments")
+@click.argument("target", type=click.File("w"), default="-")
+@click.option("--include-private", is_flag=True)
+def export_comments_command(target, include_private):
+    """Export comments as NDJSON to a file (or stdout)."""
+    for line in export_comments(public_only=not include_private):
+        target.write(line)
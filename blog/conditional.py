@@ -0,0 +1,37 @@
+import hashlib
+from datetime import timezone
+from flask import current_app, request
+
+def version_etag(*parts):
+    """Strong ETag built from the version data of the resources in a response"""
+    return hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+def _as_utc(value):
+    return value.replace(tzinfo=timezone.utc, microsecond=0) if value else None
+
+def not_modified(etag, last_modified=None):
+    """Return a 304 response if the client's cached copy is still current.
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2),
+    so the date is only consulted when the client sent no ETag. It uses weak
+    comparison, so ETags weakened by response compression still match.
+    """
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified:
+        fresh = _as_utc(last_modified) <= request.if_modified_since
+    else:
+        fresh = False
+
+    if not fresh:
+        return None
+    return with_validators(current_app.response_class(status=304), etag, last_modified)
+
+def with_validators(response, etag, last_modified=None):
+    """Attach ETag/Last-Modified and require revalidation by shared caches"""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = _as_utc(last_modified)
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response
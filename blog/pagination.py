@@ -0,0 +1,133 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(timestamp, item_id, direction="next"):
+    """Encode a (timestamp, id) keyset position into an opaque URL-safe token"""
+    payload = json.dumps([timestamp.isoformat(), item_id, direction], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(token):
+    """Decode a cursor token back into (timestamp, id, direction)"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        timestamp, item_id, direction = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return datetime.fromisoformat(timestamp), int(item_id), direction
+    except (ValueError, TypeError, json.JSONDecodeError) as e:
+        raise InvalidCursor("Invalid pagination cursor") from e
+
+class Page:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def cursors(self):
+        """Cursor block for JSON responses"""
+        return {'next': self.next_cursor, 'prev': self.prev_cursor}
+
+class StreamedPage(Page):
+    """Page whose rows are fetched from the database in chunks while iterating.
+
+    Iterate it once; cursors are only set after iteration finishes.
+    """
+
+    def __init__(self, query, timestamp_col, id_col, per_page, has_prev):
+        super().__init__(None)
+        self._query = query
+        self._attrs = (timestamp_col.key, id_col.key)
+        self._per_page = per_page
+        self._has_prev = has_prev
+
+    def __iter__(self):
+        ts_attr, id_attr = self._attrs
+        first = last = None
+        seen = 0
+        # Consume the whole result (at most one extra row) so the cursor is closed
+        for row in self._query:
+            seen += 1
+            if seen > self._per_page:
+                continue
+            key = (getattr(row, ts_attr), getattr(row, id_attr))
+            first = first or key
+            last = key
+            yield row
+
+        if seen > self._per_page:
+            self.next_cursor = encode_cursor(*last, "next")
+        if first and self._has_prev:
+            self.prev_cursor = encode_cursor(*first, "prev")
+
+def keyset_stream(query, timestamp_col, id_col, cursor=None, per_page=20, chunk_size=100, ascending=False):
+    """Like keyset_paginate() but yields rows in chunks instead of loading the page.
+
+    Backward (prev) pages are read in reverse order and have to be
+    reversed, so those are still loaded in one go.
+    """
+    if cursor and decode_cursor(cursor)[2] == "prev":
+        return keyset_paginate(query, timestamp_col, id_col, cursor, per_page, ascending)
+    key = tuple_(timestamp_col, id_col)
+    if cursor:
+        ts, item_id, _ = decode_cursor(cursor)
+        query = query.filter(key > tuple_(ts, item_id) if ascending else key < tuple_(ts, item_id))
+    if ascending:
+        query = query.order_by(timestamp_col.asc(), id_col.asc())
+    else:
+        query = query.order_by(timestamp_col.desc(), id_col.desc())
+    query = query.limit(per_page + 1).yield_per(chunk_size)
+    return StreamedPage(query, timestamp_col, id_col, per_page, has_prev=bool(cursor))
+
+def keyset_paginate(query, timestamp_col, id_col, cursor=None, per_page=20, ascending=False):
+    """Paginate a query newest-first (oldest-first with ascending) on (timestamp, id) without OFFSET.
+
+    Each page is a single range scan starting at the cursor position, so the
+    cost stays flat no matter how deep the client pages.
+    """
+    direction = "next"
+    if cursor:
+        ts, item_id, direction = decode_cursor(cursor)
+    # "next" scans away from the first page, "prev" back towards it
+    descending = (direction == "next") != ascending
+    if cursor:
+        key = tuple_(timestamp_col, id_col)
+        if descending:
+            query = query.filter(key < tuple_(ts, item_id))
+        else:
+            query = query.filter(key > tuple_(ts, item_id))
+
+    if descending:
+        query = query.order_by(timestamp_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(timestamp_col.asc(), id_col.asc())
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == "prev":
+        rows.reverse()
+
+    if not rows:
+        return Page(rows)
+
+    first, last = rows[0], rows[-1]
+    ts_attr, id_attr = timestamp_col.key, id_col.key
+    # Moving backwards we know a newer page exists only if we over-fetched;
+    # moving forwards any cursor means we came from a newer page.
+    has_next = has_more if direction == "next" else True
+    has_prev = bool(cursor) if direction == "next" else has_more
+
+    next_cursor = encode_cursor(getattr(last, ts_attr), getattr(last, id_attr), "next") if has_next else None
+    prev_cursor = encode_cursor(getattr(first, ts_attr), getattr(first, id_attr), "prev") if has_prev else None
+    return Page(rows, next_cursor, prev_cursor)
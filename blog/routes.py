@@ -1,8 +1,23 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
-from extensions import db
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, current_app, Response, stream_with_context
+from extensions import db, feed_cache, user_cache, view_counter
 from models import Post, Comment, User
+from blog.pagination import keyset_paginate, keyset_stream, InvalidCursor
+from blog.conditional import version_etag, not_modified, with_validators
+from blog.search import search_posts, index_post, unindex_post
+from blog.trending import trending_posts
+from blog.timeline import fan_out, publish, remove_from_timelines, follow, unfollow, is_following, timeline_page
+from blog.bulk import import_posts, import_comments, export_posts, export_comments
+from blog.streaming import json_stream_response
+from querycount import query_budget
+from database import read_replica
+from ratelimit import rate_limit
+from sqlalchemy import delete, func, update
+from sqlalchemy.orm import joinedload, defer, undefer
+from sqlalchemy.orm.attributes import set_committed_value
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
 from functools import wraps
+from urllib.parse import urlencode
 
 blog_bp = Blueprint("blog", __name__, template_folder="../templates")
 
@@ -15,15 +30,110 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def page_args(max_per_page=None, default=None):
+    """Cursor and clamped page size from the request args"""
+    per_page = request.args.get("limit", default or current_app.config["POSTS_PER_PAGE"], type=int)
+    per_page = max(1, min(per_page, max_per_page or current_app.config["MAX_POSTS_PER_PAGE"]))
+    return request.args.get("cursor"), per_page
+
+@blog_bp.app_template_global()
+def page_url(cursor):
+    """The current URL with only the cursor replaced, keeping limit and other args"""
+    args = request.args.to_dict()
+    args.update(request.view_args or {}, cursor=cursor)
+    return url_for(request.endpoint, **args)
+
+def wants_stream():
+    return request.args.get("stream", type=int) == 1
+
+def stream_posts(query):
+    """Stream a keyset page of posts as JSON; ?stream=1 also allows larger pages"""
+    cursor, per_page = page_args(current_app.config["MAX_STREAMED_POSTS_PER_PAGE"])
+    page = keyset_stream(query, Post.timestamp, Post.id, cursor, per_page,
+                         current_app.config["JSON_STREAM_CHUNK_SIZE"])
+    return json_stream_response("posts", page, Post.to_dict, lambda: {'cursors': page.cursors()})
+
+def paginate_posts(query):
+    """Keyset-paginate a Post query using the cursor/limit request args"""
+    cursor, per_page = page_args()
+    return keyset_paginate(query, Post.timestamp, Post.id, cursor, per_page)
+
+def comment_page(post_id, stream=False):
+    """Keyset page of a thread: top-level comments newest-first, or with
+    ?parent=<comment id> that comment's replies oldest-first"""
+    parent_id = request.args.get("parent", type=int)
+    query = Comment.query.options(joinedload(Comment.author)).filter_by(post_id=post_id, parent_id=parent_id)
+    if stream:
+        cursor, per_page = page_args(current_app.config["MAX_STREAMED_POSTS_PER_PAGE"])
+        return keyset_stream(query, Comment.timestamp, Comment.id, cursor, per_page,
+                             current_app.config["JSON_STREAM_CHUNK_SIZE"], ascending=parent_id is not None)
+    cursor, per_page = page_args(default=current_app.config["COMMENTS_PER_PAGE"])
+    return keyset_paginate(query, Comment.timestamp, Comment.id, cursor, per_page, ascending=parent_id is not None)
+
+def add_comment(post, user_id, content, parent_id=None):
+    """Add a comment or reply; returns None if the parent is not in this post's thread"""
+    if parent_id is not None:
+        # Bumping the counter doubles as the check that the parent belongs to this post
+        result = db.session.execute(
+            update(Comment).where(Comment.id == parent_id, Comment.post_id == post.id)
+            .values(reply_count=Comment.reply_count + 1)
+        )
+        if result.rowcount != 1:
+            db.session.rollback()
+            return None
+    comment = Comment(content=content, user_id=user_id, post_id=post.id, parent_id=parent_id)
+    db.session.add(comment)
+    post.comment_count = Post.comment_count + 1
+    db.session.commit()
+    # Feed pages show comment counts
+    feed_cache.invalidate()
+    return comment
+
+def delete_post_rows(post):
+    """Delete a post with its whole thread, index entry and timeline copies (call before commit)"""
+    # One statement for the thread; the ORM cascade would load every comment first
+    db.session.execute(delete(Comment).where(Comment.post_id == post.id))
+    # Nothing left for the Post.comments cascade to load
+    set_committed_value(post, "comments", [])
+    db.session.delete(post)
+    unindex_post(post.id)
+    remove_from_timelines(post.id)
+
+def feed_cache_key(name):
+    cursor, per_page = page_args()
+    # Cached pagination links repeat the other query args, so they are part of the key
+    extra = urlencode(sorted((key, value) for key, value in request.args.items(multi=True)
+                             if key not in ("cursor", "limit")))
+    return f"{name}:{cursor or ''}:{per_page}:{extra}"
+
+def public_feed_page(*options):
+    return paginate_posts(Post.query.options(joinedload(Post.author), *options).filter_by(is_public=True))
+
+@blog_bp.errorhandler(InvalidCursor)
+def handle_invalid_cursor(e):
+    if request.path.startswith("/api/"):
+        return jsonify({'error': str(e)}), 400
+    flash("That page link is no longer valid.", "warning")
+    return redirect(url_for(request.endpoint or "blog.home", **(request.view_args or {})))
+
 # Web Routes
 @blog_bp.route("/")
+@read_replica
+@query_budget(1)
 def home():
-    posts = Post.query.filter_by(is_public=True).order_by(Post.timestamp.desc()).all()
-    return render_template("home.html", posts=posts)
+    feed_html, _ = feed_cache.get_or_set(
+        feed_cache_key("home"),
+        # Listings render the stored excerpt, so never pull the full body
+        lambda: render_template("_post_list.html", posts=public_feed_page(defer(Post.content))),
+    )
+    return render_template("home.html", feed_html=feed_html)
 
 @blog_bp.route("/post/<int:post_id>", methods=["GET", "POST"])
+@read_replica
+@rate_limit("10/minute", "100/day", scope="user", methods=["POST"])
+@query_budget(4)
 def post_detail(post_id):
-    post = Post.query.get_or_404(post_id)
+    post = Post.query.options(joinedload(Post.author), undefer(Post.content_html)).get_or_404(post_id)
     
     # Check if post is public or user owns it
     if not post.is_public and session.get("user_id") != post.user_id:
@@ -36,16 +146,22 @@ def post_detail(post_id):
             return redirect(url_for("auth.login"))
         
         content = request.form["content"].strip()
+        parent_id = request.form.get("parent_id", type=int)
         if content:
-            new_comment = Comment(content=content, user_id=session["user_id"], post_id=post.id)
-            db.session.add(new_comment)
-            db.session.commit()
-            flash("Comment added!", "success")
-        return redirect(url_for("blog.post_detail", post_id=post.id))
+            if add_comment(post, session["user_id"], content, parent_id) is None:
+                flash("That comment no longer exists.", "warning")
+            else:
+                flash("Reply added!" if parent_id else "Comment added!", "success")
+        return redirect(url_for("blog.post_detail", post_id=post_id))
 
-    return render_template("post_detail.html", post=post)
+    view_counter.record(post.id)
+    # Only one page of top-level comments; reply branches are fetched on demand
+    comments = comment_page(post.id)
+    following = "user_id" in session and is_following(session["user_id"], post.user_id)
+    return render_template("post_detail.html", post=post, comments=comments, following=following)
 
 @blog_bp.route("/create", methods=["GET", "POST"])
+@rate_limit("5/minute", "50/day", scope="user", methods=["POST"])
 @login_required
 def create_post():
     if request.method == "POST":
@@ -61,7 +177,10 @@ def create_post():
                 is_public=is_public
             )
             db.session.add(new_post)
+            index_post(new_post)
+            fan_out(new_post)
             db.session.commit()
+            feed_cache.invalidate()
             flash("Post created successfully!", "success")
             return redirect(url_for("blog.home"))
         else:
@@ -71,6 +190,7 @@ def create_post():
 
 @blog_bp.route("/edit/<int:post_id>", methods=["GET", "POST"])
 @login_required
+@query_budget(7)
 def edit_post(post_id):
     post = Post.query.get_or_404(post_id)
     
@@ -85,10 +205,15 @@ def edit_post(post_id):
         is_public = request.form.get("is_public", "off") == "on"
         
         if title and content:
+            was_public = post.is_public
             post.title = title
             post.content = content
             post.is_public = is_public
+            index_post(post)
+            if is_public and not was_public:
+                publish(post)
             db.session.commit()
+            feed_cache.invalidate()
             flash("Post updated successfully!", "success")
             return redirect(url_for("blog.post_detail", post_id=post.id))
         else:
@@ -98,6 +223,7 @@ def edit_post(post_id):
 
 @blog_bp.route("/delete/<int:post_id>", methods=["POST"])
 @login_required
+@query_budget(5)
 def delete_post(post_id):
     post = Post.query.get_or_404(post_id)
     
@@ -106,34 +232,139 @@ def delete_post(post_id):
         flash("You can only delete your own posts.", "danger")
         return redirect(url_for("blog.home"))
     
-    db.session.delete(post)
+    delete_post_rows(post)
     db.session.commit()
+    feed_cache.invalidate()
     flash("Post deleted successfully!", "success")
     return redirect(url_for("blog.profile"))
 
+def search_args():
+    page = max(1, min(request.args.get("page", 1, type=int), current_app.config["SEARCH_MAX_PAGE"]))
+    _, per_page = page_args()
+    return request.args.get("q", "").strip(), page, per_page
+
+@blog_bp.route("/search")
+@read_replica
+@query_budget(2)
+def search():
+    q, page, per_page = search_args()
+    results, has_next = search_posts(q, page, per_page)
+    return render_template("search.html", q=q, results=results, page=page, has_next=has_next)
+
+def trending_limit():
+    size = current_app.config["TRENDING_SIZE"]
+    return max(1, min(request.args.get("limit", size, type=int), size))
+
+@blog_bp.route("/trending")
+@read_replica
+@query_budget(1)
+def trending():
+    return render_template("trending.html", trending=trending_posts(trending_limit()))
+
 @blog_bp.route("/profile")
+@read_replica
 @login_required
+@query_budget(2)
 def profile():
-    user = User.query.get(session["user_id"])
-    user_posts = Post.query.filter_by(user_id=session["user_id"]).order_by(Post.timestamp.desc()).all()
+    user = user_cache.get(session["user_id"])
+    user_posts = paginate_posts(Post.query.options(defer(Post.content)).filter_by(user_id=session["user_id"]))
     return render_template("profile.html", user=user, posts=user_posts)
 
 @blog_bp.route("/my-posts")
+@read_replica
 @login_required
+@query_budget(1)
 def my_posts():
-    posts = Post.query.filter_by(user_id=session["user_id"]).order_by(Post.timestamp.desc()).all()
+    posts = paginate_posts(Post.query.options(defer(Post.content)).filter_by(user_id=session["user_id"]))
     return render_template("my_posts.html", posts=posts)
 
+@blog_bp.route("/feed")
+@read_replica
+@login_required
+@query_budget(4)
+def feed():
+    cursor, per_page = page_args()
+    posts = timeline_page(session["user_id"], cursor, per_page)
+    return render_template("feed.html", posts=posts)
+
+@blog_bp.route("/follow/<int:user_id>", methods=["POST"])
+@rate_limit("30/minute", scope="user")
+@login_required
+def follow_user(user_id):
+    User.query.get_or_404(user_id)
+    if user_id == session["user_id"]:
+        flash("You can't follow yourself.", "warning")
+    elif follow(session["user_id"], user_id):
+        flash("You are now following this author.", "success")
+    return redirect(request.referrer or url_for("blog.feed"))
+
+@blog_bp.route("/unfollow/<int:user_id>", methods=["POST"])
+@rate_limit("30/minute", scope="user")
+@login_required
+def unfollow_user(user_id):
+    if unfollow(session["user_id"], user_id):
+        flash("You unfollowed this author.", "success")
+    return redirect(request.referrer or url_for("blog.feed"))
+
 # API Routes
 @blog_bp.route("/api/posts", methods=["GET"])
+@read_replica
+@query_budget(1)
 def api_get_posts():
-    posts = Post.query.filter_by(is_public=True).order_by(Post.timestamp.desc()).all()
-    return jsonify({'posts': [post.to_dict() for post in posts]}), 200
+    if wants_stream():
+        # Big pages bypass the feed cache: the point is to never hold the whole body
+        return stream_posts(Post.query.options(joinedload(Post.author)).filter_by(is_public=True))
+
+    def encode_page():
+        page = public_feed_page()
+        etag = version_etag("posts", page.next_cursor, page.prev_cursor,
+                            *((post.id, post.updated_at) for post in page))
+        last_modified = max((post.updated_at for post in page if post.updated_at), default=None)
+        body = current_app.json.dumps({'posts': [post.to_dict() for post in page], 'cursors': page.cursors()})
+        # Validators are cached alongside the body so hits can answer 304s too
+        return "\n".join([etag, last_modified.isoformat() if last_modified else "", body])
+
+    cached, hit = feed_cache.get_or_set(feed_cache_key("api_posts"), encode_page)
+    etag, last_modified, body = cached.split("\n", 2)
+    last_modified = datetime.fromisoformat(last_modified) if last_modified else None
+
+    response = not_modified(etag, last_modified)
+    if response is None:
+        response = current_app.response_class(body, status=200, mimetype="application/json")
+    response.headers["X-Cache"] = "HIT" if hit else "MISS"
+    return with_validators(response, etag, last_modified)
+
+@blog_bp.route("/api/search", methods=["GET"])
+@read_replica
+@query_budget(2)
+def api_search():
+    q, page, per_page = search_args()
+    if not q:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    results, has_next = search_posts(q, page, per_page)
+    return jsonify({
+        'results': [result.to_dict() for result in results],
+        'page': page,
+        'has_next': has_next,
+    }), 200
+
+@blog_bp.route("/api/posts/trending", methods=["GET"])
+@read_replica
+@query_budget(1)
+def api_trending_posts():
+    posts = []
+    for post, score in trending_posts(trending_limit()):
+        data = post.to_dict()
+        data.update(view_count=post.view_count, trending_score=score)
+        posts.append(data)
+    return jsonify({'posts': posts}), 200
 
 @blog_bp.route("/api/posts", methods=["POST"])
+@rate_limit("5/minute", "50/day", scope="user")
 @jwt_required()
+@query_budget(6)
 def api_create_post():
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     data = request.get_json()
     
     if not data or not data.get('title') or not data.get('content'):
@@ -146,29 +377,41 @@ def api_create_post():
         is_public=data.get('is_public', True)
     )
     db.session.add(post)
+    index_post(post)
+    fan_out(post)
     db.session.commit()
+    feed_cache.invalidate()
     
     return jsonify({'post': post.to_dict()}), 201
 
 @blog_bp.route("/api/posts/<int:post_id>", methods=["GET"])
+@read_replica
+@query_budget(1)
 def api_get_post(post_id):
-    post = Post.query.get_or_404(post_id)
+    post = Post.query.options(joinedload(Post.author), undefer(Post.content_html)).get_or_404(post_id)
     
     if not post.is_public:
         return jsonify({'error': 'Post is private'}), 403
     
-    return jsonify({'post': post.to_dict()}), 200
+    view_counter.record(post.id)
+    etag = version_etag("post", post.id, post.updated_at)
+    response = not_modified(etag, post.updated_at)
+    if response is None:
+        response = jsonify({'post': dict(post.to_dict(), content_html=str(post.html))})
+    return with_validators(response, etag, post.updated_at)
 
 @blog_bp.route("/api/posts/<int:post_id>", methods=["PUT"])
 @jwt_required()
+@query_budget(8)
 def api_update_post(post_id):
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     post = Post.query.get_or_404(post_id)
     
     if post.user_id != user_id:
         return jsonify({'error': 'Unauthorized'}), 403
     
     data = request.get_json()
+    was_public = post.is_public
     
     if data.get('title'):
         post.title = data['title']
@@ -177,36 +420,60 @@ def api_update_post(post_id):
     if 'is_public' in data:
         post.is_public = data['is_public']
     
+    index_post(post)
+    if post.is_public and not was_public:
+        publish(post)
     db.session.commit()
+    feed_cache.invalidate()
     return jsonify({'post': post.to_dict()}), 200
 
 @blog_bp.route("/api/posts/<int:post_id>", methods=["DELETE"])
 @jwt_required()
+@query_budget(5)
 def api_delete_post(post_id):
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     post = Post.query.get_or_404(post_id)
     
     if post.user_id != user_id:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    db.session.delete(post)
+    delete_post_rows(post)
     db.session.commit()
+    feed_cache.invalidate()
     return jsonify({'message': 'Post deleted successfully'}), 200
 
 @blog_bp.route("/api/posts/<int:post_id>/comments", methods=["GET"])
+@read_replica
+@query_budget(3)
 def api_get_comments(post_id):
     post = Post.query.get_or_404(post_id)
     
     if not post.is_public:
         return jsonify({'error': 'Post is private'}), 403
     
-    comments = Comment.query.filter_by(post_id=post_id).order_by(Comment.timestamp.desc()).all()
-    return jsonify({'comments': [comment.to_dict() for comment in comments]}), 200
+    # Cheap aggregate first so unchanged threads never load the comment rows
+    count, last_modified, last_id = db.session.query(
+        func.count(Comment.id), func.max(Comment.updated_at), func.max(Comment.id)
+    ).filter(Comment.post_id == post_id).one()
+    etag = version_etag("comments", post_id, count, last_modified, last_id,
+                        request.args.get("parent"), request.args.get("cursor"),
+                        request.args.get("limit"), request.args.get("stream"))
+    response = not_modified(etag, last_modified)
+    if response is None:
+        if wants_stream():
+            page = comment_page(post_id, stream=True)
+            response = json_stream_response("comments", page, Comment.to_dict, lambda: {'cursors': page.cursors()})
+        else:
+            page = comment_page(post_id)
+            response = jsonify({'comments': [comment.to_dict() for comment in page], 'cursors': page.cursors()})
+    return with_validators(response, etag, last_modified)
 
 @blog_bp.route("/api/posts/<int:post_id>/comments", methods=["POST"])
+@rate_limit("10/minute", "100/day", scope="user")
 @jwt_required()
+@query_budget(6)
 def api_create_comment(post_id):
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     post = Post.query.get_or_404(post_id)
     data = request.get_json()
     
@@ -216,19 +483,91 @@ def api_create_comment(post_id):
     if not post.is_public:
         return jsonify({'error': 'Cannot comment on private posts'}), 403
     
-    comment = Comment(
-        content=data['content'],
-        user_id=user_id,
-        post_id=post_id
-    )
-    db.session.add(comment)
-    db.session.commit()
+    parent_id = data.get('parent_id')
+    if parent_id is not None and not isinstance(parent_id, int):
+        return jsonify({'error': 'parent_id must be a comment id'}), 400
+    
+    comment = add_comment(post, user_id, data['content'], parent_id)
+    if comment is None:
+        return jsonify({'error': 'Parent comment not found on this post'}), 404
     
     return jsonify({'comment': comment.to_dict()}), 201
 
 @blog_bp.route("/api/my-posts", methods=["GET"])
+@read_replica
 @jwt_required()
+@query_budget(1)
 def api_get_my_posts():
-    user_id = get_jwt_identity()
-    posts = Post.query.filter_by(user_id=user_id).order_by(Post.timestamp.desc()).all()
-    return jsonify({'posts': [post.to_dict() for post in posts]}), 200
\ No newline at end of file
+    user_id = int(get_jwt_identity())
+    query = Post.query.options(joinedload(Post.author)).filter_by(user_id=user_id)
+    if wants_stream():
+        return stream_posts(query)
+    page = paginate_posts(query)
+    return jsonify({'posts': [post.to_dict() for post in page], 'cursors': page.cursors()}), 200
+
+@blog_bp.route("/api/feed", methods=["GET"])
+@read_replica
+@jwt_required()
+@query_budget(4)
+def api_get_feed():
+    cursor, per_page = page_args()
+    page = timeline_page(int(get_jwt_identity()), cursor, per_page)
+    return jsonify({'posts': [post.to_dict() for post in page], 'cursors': page.cursors()}), 200
+
+@blog_bp.route("/api/users/<int:user_id>/follow", methods=["POST"])
+@rate_limit("30/minute", scope="user")
+@jwt_required()
+def api_follow_user(user_id):
+    follower_id = int(get_jwt_identity())
+    User.query.get_or_404(user_id)
+    if user_id == follower_id:
+        return jsonify({'error': 'You cannot follow yourself'}), 400
+    follow(follower_id, user_id)
+    return jsonify({'following': True}), 200
+
+@blog_bp.route("/api/users/<int:user_id>/follow", methods=["DELETE"])
+@rate_limit("30/minute", scope="user")
+@jwt_required()
+def api_unfollow_user(user_id):
+    unfollow(int(get_jwt_identity()), user_id)
+    return jsonify({'following': False}), 200
+
+def ndjson_response(lines):
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+@blog_bp.route("/api/bulk/posts", methods=["POST"])
+@rate_limit("10/hour", scope="user")
+@jwt_required()
+def api_bulk_import_posts():
+    """Import NDJSON posts (one object per line) owned by the caller"""
+    report = import_posts(request.stream, user_id=int(get_jwt_identity()))
+    return jsonify(report.to_dict()), 201 if report.imported else 400
+
+@blog_bp.route("/api/bulk/comments", methods=["POST"])
+@rate_limit("10/hour", scope="user")
+@jwt_required()
+def api_bulk_import_comments():
+    """Import NDJSON comments authored by the caller onto public posts"""
+    report = import_comments(request.stream, user_id=int(get_jwt_identity()))
+    return jsonify(report.to_dict()), 201 if report.imported else 400
+
+@blog_bp.route("/api/bulk/posts", methods=["GET"])
+@read_replica
+@rate_limit("10/hour", scope="user")
+@jwt_required()
+def api_bulk_export_posts():
+    return ndjson_response(export_posts())
+
+@blog_bp.route("/api/bulk/comments", methods=["GET"])
+@read_replica
+@rate_limit("10/hour", scope="user")
+@jwt_required()
+def api_bulk_export_comments():
+    return ndjson_response(export_comments())
+
+@blog_bp.route("/api/bulk/my-posts", methods=["GET"])
+@read_replica
+@rate_limit("10/hour", scope="user")
+@jwt_required()
+def api_bulk_export_my_posts():
+    return ndjson_response(export_posts(public_only=False, user_id=int(get_jwt_identity())))
@@ -0,0 +1,121 @@
+import re
+from markupsafe import Markup, escape
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import joinedload
+from extensions import db
+from models import Post
+
+# Highlight markers that cannot occur in user text; swapped for <mark> after escaping
+MARK_START, MARK_END = "\x02", "\x03"
+
+# Title matches outrank body matches
+TSVECTOR_SQL = ("setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(content, '')), 'B')")
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+def index_post(post):
+    """Add or refresh a post in the full-text index (call before commit)"""
+    db.session.flush()
+    if _dialect() == "postgresql":
+        db.session.execute(text(f"UPDATE post SET search_vector = {TSVECTOR_SQL} WHERE id = :id"),
+                           {"id": post.id})
+    else:
+        db.session.execute(text("DELETE FROM post_search WHERE rowid = :id"), {"id": post.id})
+        db.session.execute(text(
+            "INSERT INTO post_search (rowid, title, content) VALUES (:id, :title, :content)"
+        ), {"id": post.id, "title": post.title, "content": post.content})
+
+def reindex_posts(post_ids=None):
+    """Rebuild index entries for many posts with set-based SQL (seeding, bulk import)"""
+    if post_ids is not None:
+        post_ids = list(post_ids)
+        if not post_ids:
+            return
+
+    def scoped(sql, column="id"):
+        if post_ids is None:
+            return text(sql), {}
+        return (text(f"{sql} WHERE {column} IN :ids").bindparams(bindparam("ids", expanding=True)),
+                {"ids": post_ids})
+
+    if _dialect() == "postgresql":
+        db.session.execute(*scoped(f"UPDATE post SET search_vector = {TSVECTOR_SQL}"))
+    else:
+        db.session.execute(*scoped("DELETE FROM post_search", "rowid"))
+        db.session.execute(*scoped("INSERT INTO post_search (rowid, title, content) "
+                                   "SELECT id, title, content FROM post"))
+
+def unindex_post(post_id):
+    """Remove a deleted post from the index (the tsvector column goes with the row)"""
+    if _dialect() != "postgresql":
+        db.session.execute(text("DELETE FROM post_search WHERE rowid = :id"), {"id": post_id})
+
+def _fts5_query(terms):
+    # Quote every token so user input can never be parsed as FTS5 syntax
+    return " ".join('"{}"'.format(token.replace('"', '""')) for token in terms.split())
+
+def _highlight(snippet):
+    return Markup(str(escape(snippet or ""))
+                  .replace(MARK_START, "<mark>").replace(MARK_END, "</mark>"))
+
+class SearchResult:
+    def __init__(self, post, rank, snippet):
+        self.post = post
+        self.rank = rank
+        self.snippet = snippet
+
+    def to_dict(self):
+        return {
+            'post': self.post.to_dict(),
+            'rank': self.rank,
+            'snippet': str(self.snippet),
+        }
+
+def search_posts(terms, page=1, per_page=20):
+    """Ranked full-text search over public posts.
+
+    Returns (results, has_next). Snippets are only generated for the rows on
+    the requested page.
+    """
+    terms = re.sub(r"\s+", " ", terms or "").strip()
+    if not terms:
+        return [], False
+
+    params = {"limit": per_page + 1, "offset": (page - 1) * per_page}
+    if _dialect() == "postgresql":
+        sql = text(
+            "SELECT hits.id, hits.rank, "
+            "ts_headline('english', p.content, hits.query, :headline) AS snippet "
+            "FROM ("
+            "  SELECT post.id, ts_rank(post.search_vector, q) AS rank, q AS query "
+            "  FROM post, websearch_to_tsquery('english', :terms) AS q "
+            "  WHERE post.search_vector @@ q AND post.is_public "
+            "  ORDER BY rank DESC, post.id DESC LIMIT :limit OFFSET :offset"
+            ") AS hits JOIN post p ON p.id = hits.id "
+            "ORDER BY hits.rank DESC, hits.id DESC"
+        )
+        params.update(terms=terms, headline=f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=35, MinWords=15")
+    else:
+        # bm25() is lower-is-better; weight title matches over body matches
+        sql = text(
+            "SELECT post_search.rowid AS id, -bm25(post_search, 10.0, 1.0) AS rank, "
+            "snippet(post_search, 1, :start, :end, '…', 24) AS snippet "
+            "FROM post_search JOIN post ON post.id = post_search.rowid "
+            "WHERE post_search MATCH :terms AND post.is_public "
+            "ORDER BY bm25(post_search, 10.0, 1.0), post.id DESC LIMIT :limit OFFSET :offset"
+        )
+        params.update(terms=_fts5_query(terms), start=MARK_START, end=MARK_END)
+
+    hits = db.session.execute(sql, params).all()
+    has_next = len(hits) > per_page
+    hits = hits[:per_page]
+    if not hits:
+        return [], False
+
+    posts = {post.id: post for post in
+             Post.query.options(joinedload(Post.author)).filter(Post.id.in_([hit.id for hit in hits]))}
+    results = [SearchResult(posts[hit.id], hit.rank, _highlight(hit.snippet))
+               for hit in hits if hit.id in posts]
+    return results, has_next
@@ -0,0 +1,28 @@
+from flask import current_app, stream_with_context
+
+def iter_json_object(key, items, serialize, tail=None, chunk_size=None):
+    """Yield {key: [serialize(item), ...], **tail()} as JSON text, a chunk of items at a time.
+
+    tail is called once the items are exhausted, so it may report things
+    only known after iterating (like pagination cursors).
+    """
+    dumps = current_app.json.dumps
+    chunk_size = chunk_size or current_app.config["JSON_STREAM_CHUNK_SIZE"]
+    yield "{" + dumps(key) + ":["
+    separator, chunk = "", []
+    for item in items:
+        chunk.append(dumps(serialize(item)))
+        if len(chunk) >= chunk_size:
+            yield separator + ",".join(chunk)
+            separator, chunk = ",", []
+    if chunk:
+        yield separator + ",".join(chunk)
+    yield "]"
+    for name, value in (tail() if tail else {}).items():
+        yield "," + dumps(name) + ":" + dumps(value)
+    yield "}\n"
+
+def json_stream_response(*args, **kwargs):
+    """Response streaming iter_json_object(); the request context stays open until it finishes"""
+    return current_app.response_class(stream_with_context(iter_json_object(*args, **kwargs)),
+                                      mimetype=current_app.json.mimetype)
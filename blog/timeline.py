@@ -0,0 +1,139 @@
+from flask import current_app
+from sqlalchemy import delete, insert, literal, select, union, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from extensions import db
+from models import Follow, Post, TimelineEntry, User
+from blog.pagination import Page, decode_cursor, encode_cursor, keyset_paginate
+
+TIMELINE_COLUMNS = ["user_id", "timestamp", "post_id", "author_id"]
+
+def _fans_out(author_id):
+    """SQL condition: the author is small enough for fan-out on write"""
+    follower_count = select(User.follower_count).where(User.id == author_id).scalar_subquery()
+    return follower_count <= current_app.config["FANOUT_MAX_FOLLOWERS"]
+
+def fan_out(post):
+    """Copy a new public post into the author's and their followers' timelines (call before commit).
+
+    One INSERT ... SELECT over the author's followers. Authors above
+    FANOUT_MAX_FOLLOWERS are skipped; readers pull their posts instead.
+    """
+    if not post.is_public:
+        return
+    db.session.flush()
+    author_id = int(post.user_id)
+    row = (literal(post.timestamp, db.DateTime), literal(post.id, db.Integer), literal(author_id, db.Integer))
+    followers = select(Follow.follower_id, *row).where(Follow.followed_id == author_id, _fans_out(author_id))
+    own = select(literal(author_id, db.Integer), *row).where(_fans_out(author_id))
+    db.session.execute(insert(TimelineEntry).from_select(TIMELINE_COLUMNS, union_all(followers, own)))
+
+def fan_out_posts(post_ids):
+    """fan_out for many existing posts at once (bulk import; call before commit).
+
+    One INSERT ... SELECT joining the public posts to their authors' followers.
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    posts = (Post.id.in_(post_ids), Post.is_public, _fans_out(Post.user_id))
+    followers = (select(Follow.follower_id, Post.timestamp, Post.id, Post.user_id)
+                 .join(Follow, Follow.followed_id == Post.user_id).where(*posts))
+    own = select(Post.user_id, Post.timestamp, Post.id, Post.user_id).where(*posts)
+    db.session.execute(insert(TimelineEntry).from_select(TIMELINE_COLUMNS, union_all(followers, own)))
+
+def publish(post):
+    """Fan out a post that was just switched from private to public (call before commit)"""
+    # Entries left from an earlier public spell would collide with the new copies
+    remove_from_timelines(post.id)
+    fan_out(post)
+
+def remove_from_timelines(post_id):
+    db.session.execute(delete(TimelineEntry).where(TimelineEntry.post_id == post_id))
+
+def follow(user_id, author_id):
+    """Follow author_id and backfill their recent posts; False if already following"""
+    # The primary key settles concurrent follows: only one insert wins and bumps the count
+    try:
+        db.session.add(Follow(follower_id=user_id, followed_id=author_id))
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return False
+    db.session.execute(update(User).where(User.id == author_id)
+                       .values(follower_count=User.follower_count + 1))
+    recent = (select(literal(user_id, db.Integer), Post.timestamp, Post.id, Post.user_id)
+              .where(Post.user_id == author_id, Post.is_public, _fans_out(author_id))
+              .order_by(Post.timestamp.desc(), Post.id.desc())
+              .limit(current_app.config["TIMELINE_BACKFILL"]))
+    db.session.execute(insert(TimelineEntry).from_select(TIMELINE_COLUMNS, recent))
+    db.session.commit()
+    return True
+
+def unfollow(user_id, author_id):
+    """Stop following author_id and drop their posts from the timeline; False if not following"""
+    result = db.session.execute(delete(Follow).where(Follow.follower_id == user_id,
+                                                     Follow.followed_id == author_id))
+    if result.rowcount == 0:
+        db.session.rollback()
+        return False
+    db.session.execute(update(User).where(User.id == author_id)
+                       .values(follower_count=User.follower_count - 1))
+    db.session.execute(delete(TimelineEntry).where(TimelineEntry.user_id == user_id,
+                                                   TimelineEntry.author_id == author_id))
+    db.session.commit()
+    return True
+
+def is_following(user_id, author_id):
+    return db.session.get(Follow, (user_id, author_id)) is not None
+
+def _pulled_authors(user_id):
+    """Followed authors (and the user) too big for fan-out on write"""
+    threshold = current_app.config["FANOUT_MAX_FOLLOWERS"]
+    followed = (select(User.id).join(Follow, Follow.followed_id == User.id)
+                .where(Follow.follower_id == user_id, User.follower_count > threshold))
+    own = select(User.id).where(User.id == user_id, User.follower_count > threshold)
+    return list(db.session.scalars(union(followed, own)))
+
+def timeline_page(user_id, cursor=None, per_page=20):
+    """One keyset page of a user's home timeline, newest first.
+
+    Reads a page of the user's TimelineEntry rows and, for big authors that
+    skip fan-out, a page of their posts with the same cursor; the two are
+    merged and only the page's posts are loaded.
+    """
+    direction = decode_cursor(cursor)[2] if cursor else "next"
+    sources = [keyset_paginate(
+        db.session.query(TimelineEntry.timestamp, TimelineEntry.post_id).filter_by(user_id=user_id),
+        TimelineEntry.timestamp, TimelineEntry.post_id, cursor, per_page,
+    )]
+    authors = _pulled_authors(user_id)
+    if authors:
+        sources.append(keyset_paginate(
+            db.session.query(Post.timestamp, Post.id)
+            .filter(Post.user_id.in_(authors), Post.is_public),
+            Post.timestamp, Post.id, cursor, per_page,
+        ))
+
+    keys = sorted({(timestamp, post_id) for page in sources for timestamp, post_id in page}, reverse=True)
+    overflow = len(keys) > per_page
+    # Each source holds its per_page rows nearest the cursor, so the merged page is too
+    if direction == "next":
+        keys = keys[:per_page]
+        has_next = overflow or any(page.next_cursor for page in sources)
+        has_prev = bool(cursor)
+    else:
+        keys = keys[-per_page:]
+        has_next = True
+        has_prev = overflow or any(page.prev_cursor for page in sources)
+    if not keys:
+        return Page([])
+
+    posts = {post.id: post for post in Post.query.options(joinedload(Post.author))
+             .filter(Post.id.in_([post_id for _, post_id in keys]))}
+    # Posts made private after they were fanned out stay visible only to their author
+    items = [posts[post_id] for _, post_id in keys
+             if post_id in posts and (posts[post_id].is_public or posts[post_id].user_id == user_id)]
+    return Page(items,
+                encode_cursor(*keys[-1], "next") if has_next else None,
+                encode_cursor(*keys[0], "prev") if has_prev else None)
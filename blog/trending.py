@@ -0,0 +1,73 @@
+import math
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import joinedload
+from extensions import db
+from models import Post, PostTrendingScore
+
+# Scores are stored relative to a fixed instant, so they never need rescaling
+TRENDING_EPOCH = datetime(2024, 1, 1)
+
+def _half_lives(when):
+    """Half-lives from TRENDING_EPOCH to `when`"""
+    half_life = current_app.config["TRENDING_HALF_LIFE_HOURS"] * 3600
+    return (when - TRENDING_EPOCH).total_seconds() / half_life
+
+def _log_add(a, b):
+    """log2(2**a + 2**b) without leaving log space"""
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+def record_views(pending, now=None):
+    """Add {post_id: views} seen at `now` to the posts' trending scores.
+
+    A view weighs 2**half_lives(now), so adding one in log space is a single
+    row update and older views decay without ever being rewritten. Runs in
+    the caller's transaction.
+    """
+    now = now or datetime.utcnow()
+    table = PostTrendingScore.__table__
+    offset = _half_lives(now)
+    current = dict(db.session.execute(
+        select(table.c.post_id, table.c.score).where(table.c.post_id.in_(pending)).with_for_update()
+    ).all())
+
+    new_rows, changed = [], []
+    for post_id, views in pending.items():
+        score = math.log2(views) + offset
+        if post_id in current:
+            changed.append({"pid": post_id, "new_score": _log_add(current[post_id], score), "viewed": now})
+        else:
+            new_rows.append({"post_id": post_id, "score": score, "last_viewed": now})
+    if new_rows:
+        db.session.execute(table.insert(), new_rows)
+    if changed:
+        db.session.execute(update(table).where(table.c.post_id == bindparam("pid"))
+                           .values(score=bindparam("new_score"), last_viewed=bindparam("viewed")), changed)
+
+def prune_scores(before):
+    """Drop the scores of posts not viewed since `before`"""
+    table = PostTrendingScore.__table__
+    db.session.execute(table.delete().where(table.c.last_viewed < before))
+
+def trending_posts(limit=None):
+    """[(post, score), ...] for public posts viewed in the trending window, best first.
+
+    score is the post's views, each halved every TRENDING_HALF_LIFE_HOURS
+    since it happened. One query, reading the score index best first.
+    """
+    config = current_app.config
+    now = datetime.utcnow()
+    limit = min(limit or config["TRENDING_SIZE"], config["TRENDING_SIZE"])
+    rows = db.session.execute(
+        select(Post, PostTrendingScore.score)
+        .join(PostTrendingScore, PostTrendingScore.post_id == Post.id)
+        .options(joinedload(Post.author))
+        .where(Post.is_public,
+               PostTrendingScore.last_viewed >= now - timedelta(hours=config["TRENDING_WINDOW_HOURS"]))
+        .order_by(PostTrendingScore.score.desc())
+        .limit(limit)
+    ).all()
+    offset = _half_lives(now)
+    return [(post, round(2 ** (score - offset), 3)) for post, score in rows]
@@ -0,0 +1,202 @@
+import threading
+import time
+from collections import OrderedDict
+
+class NullCache:
+    """Backend used when caching is disabled"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout):
+        pass
+
+    def incr(self, key):
+        return 0
+
+    def delete(self, key):
+        pass
+
+class SimpleCache:
+    """In-process LRU cache with per-entry TTL.
+
+    Entries live in the worker that created them, so invalidation only
+    reaches the current process; other workers see the change once their
+    copy expires. Use RedisCache when that staleness window is too long.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        expires = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        # Counters are kept outside the LRU so they can never be evicted
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+class RedisCache:
+    """Shared backend; any client with the redis-py API works (fakeredis in tests)"""
+
+    def __init__(self, client, prefix="flaskblog:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def set(self, key, value, timeout):
+        self.client.set(self.prefix + key, value, ex=timeout or None)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+class FeedCache:
+    """Caches rendered feed fragments and encoded API payloads.
+
+    Keys are namespaced by a generation counter stored in the backend;
+    write paths call invalidate() to bump it, which orphans every cached
+    page at once instead of tracking which cursors a post appeared on.
+    Values must be strings so they can live in any backend.
+    """
+
+    GENERATION_KEY = "feed:generation"
+
+    def __init__(self):
+        self.backend = NullCache()
+        self.timeout = 0
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        cache_type = app.config.get("CACHE_TYPE", "simple")
+        self.timeout = app.config.get("CACHE_DEFAULT_TIMEOUT", 60)
+
+        if cache_type == "simple":
+            self.backend = SimpleCache(app.config.get("CACHE_MAX_ENTRIES", 1024))
+        elif cache_type == "redis":
+            import redis
+            self.backend = RedisCache(redis.Redis.from_url(app.config["CACHE_REDIS_URL"]))
+        else:
+            self.backend = NullCache()
+
+        app.extensions["feed_cache"] = self
+
+    def _generation(self):
+        return self.backend.get(self.GENERATION_KEY) or 0
+
+    def get_or_set(self, key, compute):
+        """Return (value, hit) for key, computing and storing the value on a miss"""
+        full_key = f"feed:{self._generation()}:{key}"
+        value = self.backend.get(full_key)
+        if value is not None:
+            self.hits += 1
+            return value, True
+
+        self.misses += 1
+        value = compute()
+        self.backend.set(full_key, value, self.timeout)
+        return value, False
+
+    def invalidate(self):
+        """Drop every cached feed page (called after any post write)"""
+        self.backend.incr(self.GENERATION_KEY)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
+
+class UserCache:
+    """Per-process TTL cache of User.to_dict() for profile lookups.
+
+    Entries are dropped after any commit that inserts, updates or deletes
+    the user in this process; other workers pick up the change when their
+    entry expires (USER_CACHE_TIMEOUT, 0 disables the cache).
+    """
+
+    def __init__(self):
+        self.backend = NullCache()
+        self.timeout = 0
+        self._listening = False
+
+    def init_app(self, app):
+        self.timeout = app.config.get("USER_CACHE_TIMEOUT", 30)
+        if self.timeout:
+            self.backend = SimpleCache(app.config.get("USER_CACHE_MAX_ENTRIES", 4096))
+        else:
+            self.backend = NullCache()
+        app.extensions["user_cache"] = self
+        self._listen()
+
+    def _listen(self):
+        if self._listening:
+            return
+        self._listening = True
+        from sqlalchemy import event
+        from sqlalchemy.orm import object_session
+        from database import RoutingSession
+        from models import User
+
+        def track(mapper, connection, user):
+            object_session(user).info.setdefault("changed_users", set()).add(user.id)
+
+        for name in ("after_insert", "after_update", "after_delete"):
+            event.listen(User, name, track)
+        event.listen(RoutingSession, "after_commit", self._after_commit)
+
+    def _after_commit(self, session):
+        self.invalidate(*session.info.pop("changed_users", ()))
+
+    def get(self, user_id):
+        """User.to_dict() for user_id, or None if there is no such user"""
+        key = str(user_id)
+        data = self.backend.get(key)
+        if data is None:
+            from extensions import db
+            from models import User
+            user = db.session.get(User, user_id)
+            if user is None:
+                return None
+            data = user.to_dict()
+            self.backend.set(key, data, self.timeout)
+        return data
+
+    def invalidate(self, *user_ids):
+        for user_id in user_ids:
+            self.backend.delete(str(user_id))
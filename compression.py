@@ -0,0 +1,64 @@
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional; responses are gzipped without it
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "text/html", "text/css", "text/plain", "text/javascript", "text/xml",
+    "application/javascript", "application/json", "application/x-ndjson",
+    "application/xml", "image/svg+xml",
+}
+
+def available_encodings():
+    """Encodings we can produce, most preferred first"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def negotiate(accept_encodings):
+    """The preferred encoding the client accepts, or None"""
+    for encoding in available_encodings():
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+def compress(data, encoding, level=None):
+    """Compress bytes; without a level use the smallest (slowest) setting"""
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if level is None else level)
+    return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+
+def init_compression(app):
+    """Compress text responses of at least COMPRESS_MIN_SIZE bytes with brotli or gzip.
+
+    Streamed responses and files (static, NDJSON exports) are passed through;
+    fingerprinted static files have precompressed variants instead. Levels are
+    kept low because this runs on every request.
+    """
+    if not app.config.get("COMPRESS_ENABLED"):
+        return
+
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or not 200 <= response.status_code < 300 or response.status_code in (204, 206)
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        data = response.get_data()
+        if len(data) < app.config["COMPRESS_MIN_SIZE"]:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+        level = app.config["COMPRESS_BR_QUALITY"] if encoding == "br" else app.config["COMPRESS_LEVEL"]
+        response.set_data(compress(data, encoding, level))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # Same content, different bytes: only a weak validator still holds
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,86 @@
+import time
+from flask import current_app, g, request, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+REPLICA_BIND = "replica"
+PRIMARY_COOKIE = "read_primary_until"
+
+def engine_options(uri, config):
+    """SQLALCHEMY_ENGINE_OPTIONS-style dict for one database URI"""
+    options = {"pool_pre_ping": config["DB_POOL_PRE_PING"]}
+    if config["DB_POOL_RECYCLE"]:
+        options["pool_recycle"] = config["DB_POOL_RECYCLE"]
+
+    url = make_url(uri)
+    # SQLite uses a single-connection/file pool where size and overflow don't apply
+    if url.get_backend_name() != "sqlite":
+        options.update(pool_size=config["DB_POOL_SIZE"], max_overflow=config["DB_MAX_OVERFLOW"],
+                       pool_timeout=config["DB_POOL_TIMEOUT"])
+    if config["DB_STATEMENT_TIMEOUT_MS"] and url.get_backend_name() == "postgresql":
+        options["connect_args"] = {"options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    return options
+
+def read_replica(f):
+    """Let GET/HEAD requests to this view read from the replica"""
+    f.read_replica = True
+    return f
+
+def _replica_allowed():
+    return has_request_context() and g.get("_use_replica", False)
+
+class RoutingSession(Session):
+    """Session that sends plain SELECTs to the replica during read_replica requests.
+
+    Flushes, DML, SELECT ... FOR UPDATE and anything after the first write in
+    the session (a flush or an executed insert/update/delete) go to the
+    primary, so a request always reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not self.info.get("wrote")
+                and clause is not None and clause.is_select
+                and getattr(clause, "_for_update_arg", None) is None
+                and _replica_allowed()):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_written(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_executed_dml(orm_execute_state):
+    # Core insert/update/delete statements write without ever flushing
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+def init_read_routing(app):
+    """Route read_replica views to the replica bind when DATABASE_REPLICA_URI is set.
+
+    After a request writes, the client gets a short-lived cookie that pins
+    its reads to the primary for DB_REPLICA_STICKY_SECONDS, covering the
+    redirect-after-POST and the replica's replication lag.
+    """
+    if REPLICA_BIND not in app.config.get("SQLALCHEMY_BINDS", {}):
+        return
+
+    from extensions import db
+
+    @app.before_request
+    def choose_database():
+        view = current_app.view_functions.get(request.endpoint)
+        pinned = request.cookies.get(PRIMARY_COOKIE, type=float, default=0) > time.time()
+        g._use_replica = (getattr(view, "read_replica", False)
+                          and request.method in ("GET", "HEAD") and not pinned)
+
+    @app.after_request
+    def pin_writers_to_primary(response):
+        if db.session.info.get("wrote"):
+            sticky = current_app.config["DB_REPLICA_STICKY_SECONDS"]
+            response.set_cookie(PRIMARY_COOKIE, str(time.time() + sticky), max_age=sticky,
+                                httponly=True, samesite="Lax")
+        return response
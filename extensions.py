@@ -1,11 +1,61 @@
+import importlib
+import threading
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
-from flask_mail import Mail
 from flask_jwt_extended import JWTManager
-from authlib.integrations.flask_client import OAuth
+from cache import FeedCache, UserCache
+from hashing import PasswordHasher
+from database import RoutingSession
+from ratelimit import RateLimiter
+from write_behind import LastLoginBuffer, ViewCounter
+from rendering import MarkdownRenderer
 
-db = SQLAlchemy()
+class LazyExtension:
+    """Imports and initializes an extension on first use instead of at startup.
+
+    init_app() only remembers the app; the first attribute access imports
+    the extension class and runs its real init_app. Workers that never send
+    mail, run migrations or talk to Google skip importing flask_mail,
+    alembic and authlib. Only suitable for extensions whose init_app does not
+    register request hooks, which Flask refuses after the first request.
+    """
+
+    def __init__(self, import_path):
+        self._import_path = import_path
+        self._instance = None
+        self._init_args = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, *args, **kwargs):
+        self._init_args = (app, args, kwargs)
+        if self._instance is not None:
+            self._instance.init_app(app, *args, **kwargs)
+
+    def load(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    module, name = self._import_path.split(":")
+                    instance = getattr(importlib.import_module(module), name)()
+                    if self._init_args is not None:
+                        app, args, kwargs = self._init_args
+                        instance.init_app(app, *args, **kwargs)
+                    self._instance = instance
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+migrate = LazyExtension("flask_migrate:Migrate")
 bcrypt = Bcrypt()
-mail = Mail()
+mail = LazyExtension("flask_mail:Mail")
 jwt = JWTManager()
-oauth = OAuth()
\ No newline at end of file
+oauth = LazyExtension("authlib.integrations.flask_client:OAuth")
+feed_cache = FeedCache()
+user_cache = UserCache()
+hasher = PasswordHasher()
+limiter = RateLimiter()
+last_logins = LastLoginBuffer()
+view_counter = ViewCounter()
+markdown_renderer = MarkdownRenderer()
@@ -0,0 +1,37 @@
+"""gunicorn settings; picked up automatically by `gunicorn app:app`.
+
+With preload the master imports the app and compiles every template once,
+then forks: workers share that memory copy-on-write instead of each one
+building the app and compiling templates on its first requests.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+threads = int(os.getenv("GUNICORN_THREADS", 1))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from app import app
+    from templating import warm_templates
+    names = warm_templates(app)
+    server.log.info("Precompiled %d templates before forking workers", len(names))
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    # Connections opened in the master must not be shared with the workers
+    from app import app
+    from extensions import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+def worker_exit(server, worker):
+    from extensions import last_logins, view_counter
+    for buffer in (last_logins, view_counter):
+        if buffer.app is not None:
+            buffer.flush()
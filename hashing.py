@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+import bcrypt as _bcrypt
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool is saturated; map to 429/503 with Retry-After"""
+
+    def __init__(self, retry_after):
+        super().__init__("Password hashing capacity exhausted")
+        self.retry_after = retry_after
+
+# Pool workers run these, so they must stay module-level and picklable
+def _hash_password(password, rounds):
+    return _bcrypt.hashpw(password, _bcrypt.gensalt(rounds)).decode("utf-8")
+
+def _check_password(pw_hash, password):
+    return _bcrypt.checkpw(password, pw_hash)
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated process pool with bounded admission.
+
+    Request threads only wait on a future, and at most HASHING_MAX_PENDING
+    hashes may be queued or running per worker; beyond that callers get
+    HashingBusy immediately instead of piling up behind a login burst.
+    HASHING_POOL_SIZE = 0 hashes inline (tests, single-process tools).
+    """
+
+    def __init__(self):
+        self.rounds = 12
+        self.pool_size = 0
+        self.timeout = 5
+        self.retry_after = 1
+        self._slots = None
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        # Callables invoked with the wall time of each hash/check (instrumentation)
+        self.timing_hooks = []
+
+    def init_app(self, app):
+        self.rounds = app.config.get("BCRYPT_LOG_ROUNDS", 12)
+        self.pool_size = app.config.get("HASHING_POOL_SIZE", os.cpu_count() or 1)
+        self.timeout = app.config.get("HASHING_TIMEOUT", 5)
+        self.retry_after = app.config.get("HASHING_RETRY_AFTER", 1)
+        max_pending = app.config.get("HASHING_MAX_PENDING") or max(self.pool_size, 1) * 4
+        self._slots = threading.BoundedSemaphore(max_pending)
+        app.extensions["password_hasher"] = self
+
+    def _get_executor(self):
+        # Created lazily and per process so forked gunicorn workers never share a pool
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.pool_size)
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy(self.retry_after)
+
+        if not self.pool_size:
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is held until the job actually finishes, even if we stop waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HashingBusy(self.retry_after)
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return self._run(fn, *args)
+        finally:
+            for hook in self.timing_hooks:
+                hook(time.perf_counter() - start)
+
+    def generate_password_hash(self, password):
+        return self._timed(_hash_password, password.encode("utf-8"), self.rounds)
+
+    def check_password_hash(self, pw_hash, password):
+        return self._timed(_check_password, pw_hash.encode("utf-8"), password.encode("utf-8"))
+
+    def needs_rehash(self, pw_hash):
+        """True if pw_hash was made with a different work factor than configured"""
+        try:
+            return int(pw_hash.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
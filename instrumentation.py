@@ -0,0 +1,209 @@
+import cProfile
+import os
+import threading
+import time
+from datetime import datetime
+from flask import current_app, g, request, abort
+from flask.signals import before_render_template, template_rendered
+from extensions import feed_cache, hasher
+from querycount import start_counting, stop_counting
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label_names = label_names
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                base = _labels(self.label_names, labels)
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, le=bound)} {bucket_count}')
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, le="+Inf")} {count}')
+                lines.append(f"{self.name}_sum{base} {total}")
+                lines.append(f"{self.name}_count{base} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+def _labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class Metrics:
+    """Per-process metrics registry.
+
+    Each gunicorn worker keeps its own numbers; scrape every worker (or run
+    one worker per scrape target) to get the full picture.
+    """
+
+    def __init__(self):
+        self.requests = Counter("flaskblog_requests_total", "HTTP requests by endpoint and status.",
+                                ("endpoint", "method", "status"))
+        self.latency = Histogram("flaskblog_request_duration_seconds", "Request latency.",
+                                 LATENCY_BUCKETS, ("endpoint",))
+        self.queries = Histogram("flaskblog_db_queries_per_request", "SQL statements per request.",
+                                 QUERY_COUNT_BUCKETS, ("endpoint",))
+        self.query_time = Histogram("flaskblog_db_query_duration_seconds", "Total SQL time per request.",
+                                    LATENCY_BUCKETS, ("endpoint",))
+        self.template_time = Histogram("flaskblog_template_render_seconds", "Template render time.",
+                                       LATENCY_BUCKETS, ("template",))
+        self.bcrypt_time = Histogram("flaskblog_bcrypt_duration_seconds", "Password hash/check time.",
+                                     LATENCY_BUCKETS, ())
+        self.slow_profiles = Counter("flaskblog_slow_request_profiles_total", "Profiles dumped for slow requests.",
+                                     ("endpoint",))
+
+    def render(self):
+        lines = []
+        for metric in (self.requests, self.latency, self.queries, self.query_time,
+                       self.template_time, self.bcrypt_time, self.slow_profiles):
+            lines.extend(metric.render())
+        stats = feed_cache.stats()
+        lines += ["# HELP flaskblog_feed_cache_hits_total Feed cache hits.",
+                  "# TYPE flaskblog_feed_cache_hits_total counter",
+                  f"flaskblog_feed_cache_hits_total {stats['hits']}",
+                  "# HELP flaskblog_feed_cache_misses_total Feed cache misses.",
+                  "# TYPE flaskblog_feed_cache_misses_total counter",
+                  f"flaskblog_feed_cache_misses_total {stats['misses']}"]
+        return "\n".join(lines) + "\n"
+
+def _dump_profile(profiler, endpoint, elapsed):
+    directory = current_app.config.get("PROFILE_DIR") or os.path.join(current_app.instance_path, "profiles")
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(directory, f"{endpoint}-{stamp}-{int(elapsed * 1000)}ms")
+    if isinstance(profiler, cProfile.Profile):
+        profiler.dump_stats(path + ".prof")
+    else:
+        with open(path + ".html", "w") as f:
+            f.write(profiler.output_html())
+
+def _start_profiler():
+    if current_app.config.get("PROFILER") == "pyinstrument":
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+        return profiler
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another request already holds the interpreter-wide profiler
+        return None
+    return profiler
+
+def _stop_profiler(profiler):
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+    else:
+        profiler.stop()
+
+def init_instrumentation(app):
+    """Opt-in per-endpoint metrics on /metrics and slow-request profiling.
+
+    Enabled with INSTRUMENTATION_ENABLED. When PROFILE_SLOW_REQUESTS_MS is
+    set every request runs under a profiler and the profile is written to
+    PROFILE_DIR only if the request took longer than the threshold, so keep
+    that for staging or short production windows.
+    """
+    if not app.config.get("INSTRUMENTATION_ENABLED"):
+        return
+
+    metrics = Metrics()
+    app.extensions["metrics"] = metrics
+
+    def record_bcrypt(elapsed):
+        metrics.bcrypt_time.observe(elapsed)
+    hasher.timing_hooks.append(record_bcrypt)
+
+    @app.before_request
+    def start_instrumentation():
+        g._instr_start = time.perf_counter()
+        g._instr_queries, g._instr_query_token = start_counting(keep_statements=False)
+        g._instr_profiler = _start_profiler() if current_app.config.get("PROFILE_SLOW_REQUESTS_MS") else None
+
+    @app.after_request
+    def record_request(response):
+        start = g.get("_instr_start")
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or "unmatched"
+        metrics.requests.inc(endpoint, request.method, response.status_code)
+        metrics.latency.observe(elapsed, endpoint)
+        metrics.queries.observe(g._instr_queries.count, endpoint)
+        metrics.query_time.observe(g._instr_queries.duration, endpoint)
+
+        profiler = g.pop("_instr_profiler", None)
+        if profiler is not None:
+            _stop_profiler(profiler)
+            if elapsed * 1000 >= current_app.config["PROFILE_SLOW_REQUESTS_MS"]:
+                _dump_profile(profiler, endpoint, elapsed)
+                metrics.slow_profiles.inc(endpoint)
+        return response
+
+    @app.teardown_request
+    def stop_instrumentation(exc):
+        token = g.pop("_instr_query_token", None)
+        if token is not None:
+            stop_counting(token)
+        profiler = g.pop("_instr_profiler", None)
+        if profiler is not None:
+            _stop_profiler(profiler)
+
+    def start_template(sender, template, context, **extra):
+        g.setdefault("_instr_templates", []).append(time.perf_counter())
+
+    def finish_template(sender, template, context, **extra):
+        starts = g.get("_instr_templates")
+        if starts:
+            metrics.template_time.observe(time.perf_counter() - starts.pop(), template.name or "string")
+
+    before_render_template.connect(start_template, app, weak=False)
+    template_rendered.connect(finish_template, app, weak=False)
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        token = current_app.config.get("METRICS_TOKEN")
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            abort(401)
+        return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
@@ -0,0 +1,45 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib provider is used without it
+    orjson = None
+
+COMPACT_SEPARATORS = (",", ":")
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider that encodes and decodes with orjson.
+
+    Dates, dataclasses and anything orjson cannot encode natively go through
+    the default provider's hooks, and calls asking for stdlib-only options
+    (indent in debug mode, custom encoders) fall back to json, so responses
+    look the same as before, only faster.
+    """
+
+    def _options(self):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # orjson output is always compact UTF-8
+        if kwargs.get("separators") == COMPACT_SEPARATORS:
+            kwargs.pop("separators")
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._options()).decode("utf-8")
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits
+            return super().dumps(obj, separators=COMPACT_SEPARATORS)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+def init_json(app):
+    """Swap in the orjson provider when JSON_PROVIDER allows it and orjson is installed"""
+    if app.config.get("JSON_PROVIDER") == "orjson" and orjson is not None:
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,37 @@
+"""post excerpt and comment count
+
+Revision ID: 08f6d38b68ed
+Revises: 3a5589ced08a
+Create Date: 2026-10-18 12:04:13.377920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '08f6d38b68ed'
+down_revision = '3a5589ced08a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Constant server defaults keep ADD COLUMN metadata-only on PostgreSQL 11+
+    op.add_column('post', sa.Column('excerpt', sa.String(length=203), nullable=False, server_default=''))
+    op.add_column('post', sa.Column('comment_count', sa.Integer(), nullable=False, server_default='0'))
+
+    op.execute(
+        "UPDATE post SET excerpt = substr(content, 1, 200) || "
+        "CASE WHEN length(content) > 200 THEN '...' ELSE '' END"
+    )
+    op.execute(
+        "UPDATE post SET comment_count = "
+        "(SELECT count(*) FROM comment WHERE comment.post_id = post.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('post') as batch_op:
+        batch_op.drop_column('comment_count')
+        batch_op.drop_column('excerpt')
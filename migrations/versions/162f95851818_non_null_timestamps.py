@@ -0,0 +1,34 @@
+"""non-null post and comment timestamps
+
+Revision ID: 162f95851818
+Revises: 988ccc54ff2b
+Create Date: 2026-10-18 20:14:06.301552
+
+Keyset cursors are built from (timestamp, id), so rows without a
+timestamp could neither be paginated past nor encoded. Missing values are
+filled from updated_at (or now) before the columns become NOT NULL.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '162f95851818'
+down_revision = '988ccc54ff2b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('post', 'comment'):
+        op.execute(f"UPDATE {table} SET timestamp = COALESCE(updated_at, CURRENT_TIMESTAMP) "
+                   "WHERE timestamp IS NULL")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    for table in ('comment', 'post'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=True)
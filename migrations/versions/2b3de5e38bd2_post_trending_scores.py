@@ -0,0 +1,72 @@
+"""post trending scores
+
+Revision ID: 2b3de5e38bd2
+Revises: 162f95851818
+Create Date: 2026-10-18 21:02:44.518203
+
+Replaces the hourly post_view_bucket rows with one decayed score per post,
+updated by the view flush, so the trending page no longer re-aggregates
+the whole window. Scores are backfilled from the buckets still in the
+window; downgrading keeps only the view counts, not the buckets.
+
+"""
+import math
+from collections import defaultdict
+from datetime import datetime
+from alembic import op
+from flask import current_app
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b3de5e38bd2'
+down_revision = '162f95851818'
+branch_labels = None
+depends_on = None
+
+# blog.trending.TRENDING_EPOCH at the time of this migration
+TRENDING_EPOCH = datetime(2024, 1, 1)
+
+
+def upgrade():
+    score_table = op.create_table('post_trending_score',
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('last_viewed', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['post.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('post_id')
+    )
+    op.create_index('ix_post_trending_score_score', 'post_trending_score', ['score'])
+
+    half_life = current_app.config.get('TRENDING_HALF_LIFE_HOURS', 6) * 3600
+    weights, last_viewed = defaultdict(list), {}
+    buckets = op.get_bind().execute(sa.text('SELECT post_id, bucket, views FROM post_view_bucket WHERE views > 0'))
+    for post_id, bucket, views in buckets:
+        if isinstance(bucket, str):
+            bucket = datetime.fromisoformat(bucket)
+        weights[post_id].append(math.log2(views) + (bucket - TRENDING_EPOCH).total_seconds() / half_life)
+        last_viewed[post_id] = max(bucket, last_viewed.get(post_id, bucket))
+    rows = []
+    for post_id, logs in weights.items():
+        # log2 of the sum of 2**weight, shifted to stay in float range
+        high = max(logs)
+        score = high + math.log2(sum(2 ** (weight - high) for weight in logs))
+        rows.append({'post_id': post_id, 'score': score, 'last_viewed': last_viewed[post_id]})
+    if rows:
+        op.bulk_insert(score_table, rows)
+
+    op.drop_index('ix_post_view_bucket_bucket', table_name='post_view_bucket')
+    op.drop_table('post_view_bucket')
+
+
+def downgrade():
+    op.create_table('post_view_bucket',
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('views', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['post.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('post_id', 'bucket')
+    )
+    op.create_index('ix_post_view_bucket_bucket', 'post_view_bucket', ['bucket'])
+    op.drop_index('ix_post_trending_score_score', table_name='post_trending_score')
+    op.drop_table('post_trending_score')
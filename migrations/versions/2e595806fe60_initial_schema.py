@@ -0,0 +1,73 @@
+"""initial schema
+
+Revision ID: 2e595806fe60
+Revises: 
+Create Date: 2026-10-18 09:12:41.532117
+
+Matches the tables previously created by db.create_all(). Tables that
+already exist are left untouched so deployments bootstrapped with
+create_all() can simply run `flask db upgrade`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e595806fe60'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'user' not in existing:
+        op.create_table('user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('password', sa.String(length=200), nullable=True),
+            sa.Column('confirmed', sa.Boolean(), nullable=True),
+            sa.Column('google_id', sa.String(length=100), nullable=True),
+            sa.Column('avatar_url', sa.String(length=200), nullable=True),
+            sa.Column('reset_token', sa.String(length=100), nullable=True),
+            sa.Column('reset_token_expiry', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('last_login', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('email'),
+            sa.UniqueConstraint('google_id'),
+            sa.UniqueConstraint('reset_token')
+        )
+
+    if 'post' not in existing:
+        op.create_table('post',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=200), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('is_public', sa.Boolean(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'comment' not in existing:
+        op.create_table('comment',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('post_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['post_id'], ['post.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('comment')
+    op.drop_table('post')
+    op.drop_table('user')
@@ -0,0 +1,46 @@
+"""post full-text search
+
+Revision ID: 3a5589ced08a
+Revises: e5906fa644da
+Create Date: 2026-10-18 11:26:50.803192
+
+PostgreSQL gets a weighted tsvector column with a GIN index; SQLite gets
+an FTS5 table keyed by post id. Both are maintained by blog.search and
+are excluded from autogenerate in env.py.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a5589ced08a'
+down_revision = 'e5906fa644da'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TABLE post ADD COLUMN search_vector tsvector")
+        op.execute(
+            "UPDATE post SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+        )
+        with op.get_context().autocommit_block():
+            op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_post_search_vector "
+                       "ON post USING gin (search_vector)")
+    else:
+        op.execute("CREATE VIRTUAL TABLE post_search USING fts5("
+                   "title, content, tokenize = 'porter unicode61')")
+        op.execute("INSERT INTO post_search (rowid, title, content) "
+                   "SELECT id, title, content FROM post")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_post_search_vector")
+        op.execute("ALTER TABLE post DROP COLUMN search_vector")
+    else:
+        op.execute("DROP TABLE post_search")
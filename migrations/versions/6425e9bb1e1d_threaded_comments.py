@@ -0,0 +1,40 @@
+"""threaded comments
+
+Revision ID: 6425e9bb1e1d
+Revises: 08f6d38b68ed
+Create Date: 2026-10-18 16:42:07.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6425e9bb1e1d'
+down_revision = '08f6d38b68ed'
+branch_labels = None
+depends_on = None
+
+TOPLEVEL = sa.text('parent_id IS NULL')
+
+
+def upgrade():
+    with op.batch_alter_table('comment') as batch_op:
+        batch_op.add_column(sa.Column('parent_id', sa.Integer(), nullable=True))
+        # Constant server default keeps ADD COLUMN metadata-only on PostgreSQL 11+
+        batch_op.add_column(sa.Column('reply_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_foreign_key('fk_comment_parent_id_comment', 'comment', ['parent_id'], ['id'],
+                                    ondelete='CASCADE')
+
+    op.create_index('ix_comment_post_toplevel', 'comment', ['post_id', 'timestamp', 'id'],
+                    sqlite_where=TOPLEVEL, postgresql_where=TOPLEVEL)
+    op.create_index('ix_comment_parent_timestamp', 'comment', ['parent_id', 'timestamp', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_comment_parent_timestamp', table_name='comment')
+    op.drop_index('ix_comment_post_toplevel', table_name='comment')
+    with op.batch_alter_table('comment') as batch_op:
+        batch_op.drop_constraint('fk_comment_parent_id_comment', type_='foreignkey')
+        batch_op.drop_column('reply_count')
+        batch_op.drop_column('parent_id')
@@ -0,0 +1,32 @@
+"""rendered markdown
+
+Revision ID: 988ccc54ff2b
+Revises: bfbe4deb2d46
+Create Date: 2026-10-18 18:52:30.117846
+
+Existing rows keep NULL renderings and are rendered on first read; new
+and edited content is rendered when it is saved.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '988ccc54ff2b'
+down_revision = 'bfbe4deb2d46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('post', 'comment'):
+        op.add_column(table, sa.Column('content_html', sa.Text(), nullable=True))
+        op.add_column(table, sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    for table in ('comment', 'post'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('content_hash')
+            batch_op.drop_column('content_html')
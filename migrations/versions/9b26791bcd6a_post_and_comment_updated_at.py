@@ -0,0 +1,32 @@
+"""post and comment updated_at
+
+Revision ID: 9b26791bcd6a
+Revises: a09435ebf149
+Create Date: 2026-10-18 10:02:37.640115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b26791bcd6a'
+down_revision = 'a09435ebf149'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable without a server default: a metadata-only change on PostgreSQL
+    op.add_column('post', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.add_column('comment', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE post SET updated_at = timestamp WHERE updated_at IS NULL")
+    op.execute("UPDATE comment SET updated_at = timestamp WHERE updated_at IS NULL")
+
+
+def downgrade():
+    with op.batch_alter_table('comment') as batch_op:
+        batch_op.drop_column('updated_at')
+    with op.batch_alter_table('post') as batch_op:
+        batch_op.drop_column('updated_at')
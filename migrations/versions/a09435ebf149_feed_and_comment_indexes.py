@@ -0,0 +1,40 @@
+"""feed and comment indexes
+
+Revision ID: a09435ebf149
+Revises: 2e595806fe60
+Create Date: 2026-10-18 09:20:05.118604
+
+On PostgreSQL the indexes are built with CREATE INDEX CONCURRENTLY outside
+the migration transaction, so live deployments keep serving reads and
+writes while they build.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a09435ebf149'
+down_revision = '2e595806fe60'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_post_public_timestamp_id', 'post', ['is_public', 'timestamp', 'id']),
+    ('ix_post_user_timestamp_id', 'post', ['user_id', 'timestamp', 'id']),
+    ('ix_comment_post_timestamp', 'comment', ['post_id', 'timestamp']),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True,
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True,
+                          postgresql_concurrently=True)
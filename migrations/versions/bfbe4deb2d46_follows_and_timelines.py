@@ -0,0 +1,58 @@
+"""follows and timelines
+
+Revision ID: bfbe4deb2d46
+Revises: c1906c1d84bf
+Create Date: 2026-10-18 18:10:52.664019
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bfbe4deb2d46'
+down_revision = 'c1906c1d84bf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Constant server default keeps ADD COLUMN metadata-only on PostgreSQL 11+
+    op.add_column('user', sa.Column('follower_count', sa.Integer(), nullable=False, server_default='0'))
+
+    op.create_table('follow',
+        sa.Column('follower_id', sa.Integer(), nullable=False),
+        sa.Column('followed_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['followed_id'], ['user.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['follower_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('follower_id', 'followed_id')
+    )
+    op.create_index('ix_follow_followed_follower', 'follow', ['followed_id', 'follower_id'])
+
+    op.create_table('timeline_entry',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['author_id'], ['user.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['post_id'], ['post.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'timestamp', 'post_id')
+    )
+    op.create_index('ix_timeline_entry_post', 'timeline_entry', ['post_id'])
+
+    # Nobody follows anyone yet, so each timeline starts with the user's own public posts
+    op.execute(
+        "INSERT INTO timeline_entry (user_id, timestamp, post_id, author_id) "
+        "SELECT user_id, timestamp, id, user_id FROM post WHERE is_public AND timestamp IS NOT NULL"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_timeline_entry_post', table_name='timeline_entry')
+    op.drop_table('timeline_entry')
+    op.drop_index('ix_follow_followed_follower', table_name='follow')
+    op.drop_table('follow')
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('follower_count')
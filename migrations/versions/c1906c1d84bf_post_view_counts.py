@@ -0,0 +1,37 @@
+"""post view counts
+
+Revision ID: c1906c1d84bf
+Revises: 6425e9bb1e1d
+Create Date: 2026-10-18 17:25:41.902317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c1906c1d84bf'
+down_revision = '6425e9bb1e1d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Constant server default keeps ADD COLUMN metadata-only on PostgreSQL 11+
+    op.add_column('post', sa.Column('view_count', sa.Integer(), nullable=False, server_default='0'))
+
+    op.create_table('post_view_bucket',
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('views', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['post.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('post_id', 'bucket')
+    )
+    op.create_index('ix_post_view_bucket_bucket', 'post_view_bucket', ['bucket'])
+
+
+def downgrade():
+    op.drop_index('ix_post_view_bucket_bucket', table_name='post_view_bucket')
+    op.drop_table('post_view_bucket')
+    with op.batch_alter_table('post') as batch_op:
+        batch_op.drop_column('view_count')
@@ -0,0 +1,37 @@
+"""outbox email
+
+Revision ID: e5906fa644da
+Revises: 9b26791bcd6a
+Create Date: 2026-10-18 10:41:19.207553
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5906fa644da'
+down_revision = '9b26791bcd6a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbox_email',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('recipient', sa.String(length=120), nullable=False),
+        sa.Column('subject', sa.String(length=200), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_email_pending', 'outbox_email', ['sent_at', 'next_attempt_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_outbox_email_pending', table_name='outbox_email')
+    op.drop_table('outbox_email')
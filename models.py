@@ -1,8 +1,16 @@
-from extensions import db
+from extensions import db, markdown_renderer
+from sqlalchemy.orm import deferred, validates
 from datetime import datetime, timedelta
 from flask_jwt_extended import create_access_token
 import secrets
 
+EXCERPT_LENGTH = 200
+
+def make_excerpt(content):
+    """Feed preview stored alongside the post so listings never load the body"""
+    content = content or ""
+    return content[:EXCERPT_LENGTH] + ("..." if len(content) > EXCERPT_LENGTH else "")
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
@@ -15,6 +23,8 @@ class User(db.Model):
     reset_token_expiry = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime, nullable=True)
+    # Kept in step by follow/unfollow; decides fan-out on write vs on read
+    follower_count = db.Column(db.Integer, nullable=False, default=0)
     
     posts = db.relationship("Post", backref="author", lazy=True)
     comments = db.relationship("Comment", backref="author", lazy=True)
@@ -40,7 +50,7 @@ class User(db.Model):
 
     def get_jwt_token(self):
         """Generate JWT token for API access"""
-        return create_access_token(identity=self.id)
+        return create_access_token(identity=str(self.id))
 
     def to_dict(self):
         """Convert user to dictionary for JSON responses"""
@@ -55,39 +65,156 @@ class User(db.Model):
         }
 
 class Post(db.Model):
+    __table_args__ = (
+        # Public feed: WHERE is_public ORDER BY timestamp DESC, id DESC
+        db.Index("ix_post_public_timestamp_id", "is_public", "timestamp", "id"),
+        # Profile / my-posts: WHERE user_id ORDER BY timestamp DESC, id DESC
+        db.Index("ix_post_user_timestamp_id", "user_id", "timestamp", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    excerpt = db.Column(db.String(EXCERPT_LENGTH + 3), nullable=False, default="")
+    # Sanitized Markdown rendering of content, refreshed whenever content is set
+    content_html = deferred(db.Column(db.Text, nullable=True))
+    content_hash = db.Column(db.String(64), nullable=True)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     is_public = db.Column(db.Boolean, default=True)
+    comment_count = db.Column(db.Integer, nullable=False, default=0)
+    # Written in batches by the view counter, so it lags by up to VIEW_FLUSH_INTERVAL
+    view_count = db.Column(db.Integer, nullable=False, default=0)
 
     comments = db.relationship("Comment", backref="post", lazy=True, cascade="all, delete-orphan")
 
+    @validates("content")
+    def _update_derived(self, key, content):
+        self.excerpt = make_excerpt(content)
+        self.content_hash, self.content_html = markdown_renderer.render(content)
+        return content
+
+    @property
+    def html(self):
+        return markdown_renderer.html(self.content, self.content_html)
+
     def to_dict(self):
         return {
             'id': self.id,
             'title': self.title,
             'content': self.content,
+            'excerpt': self.excerpt,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'author': self.author.name,
             'author_id': self.user_id,
-            'is_public': self.is_public
+            'is_public': self.is_public,
+            'comment_count': self.comment_count
         }
 
 class Comment(db.Model):
+    __table_args__ = (
+        db.Index("ix_comment_post_timestamp", "post_id", "timestamp"),
+        # Top-level page of a thread: WHERE post_id = ? AND parent_id IS NULL ORDER BY timestamp, id
+        db.Index("ix_comment_post_toplevel", "post_id", "timestamp", "id",
+                 sqlite_where=db.text("parent_id IS NULL"), postgresql_where=db.text("parent_id IS NULL")),
+        db.Index("ix_comment_parent_timestamp", "parent_id", "timestamp", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    content_html = db.Column(db.Text, nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     post_id = db.Column(db.Integer, db.ForeignKey("post.id"), nullable=False)
+    parent_id = db.Column(db.Integer, db.ForeignKey("comment.id", ondelete="CASCADE"), nullable=True)
+    reply_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # parent_id cascades in the database; never load a thread just to delete it
+    replies = db.relationship("Comment", backref=db.backref("parent", remote_side=[id]), lazy=True,
+                              passive_deletes=True)
+
+    @validates("content")
+    def _render_content(self, key, content):
+        self.content_hash, self.content_html = markdown_renderer.render(content)
+        return content
+
+    @property
+    def html(self):
+        return markdown_renderer.html(self.content, self.content_html)
 
     def to_dict(self):
         return {
             'id': self.id,
             'content': self.content,
+            'content_html': str(self.html),
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'author': self.author.name,
             'author_id': self.user_id,
-            'post_id': self.post_id
-        }
\ No newline at end of file
+            'post_id': self.post_id,
+            'parent_id': self.parent_id,
+            'reply_count': self.reply_count
+        }
+
+class Follow(db.Model):
+    __table_args__ = (
+        # Fan-out: WHERE followed_id = ?
+        db.Index("ix_follow_followed_follower", "followed_id", "follower_id"),
+    )
+
+    follower_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    followed_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TimelineEntry(db.Model):
+    """A post in a user's home timeline, copied there when the post is created.
+
+    The primary key doubles as the timeline index: WHERE user_id = ?
+    ORDER BY timestamp DESC, post_id DESC.
+    """
+    __table_args__ = (
+        # Removing a deleted post from every timeline
+        db.Index("ix_timeline_entry_post", "post_id"),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    timestamp = db.Column(db.DateTime, primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey("post.id", ondelete="CASCADE"), primary_key=True)
+    author_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+
+class PostTrendingScore(db.Model):
+    """A post's time-decayed view count, updated by each view counter flush.
+
+    score is log2 of the post's views, each weighted by how many half-lives
+    after TRENDING_EPOCH it happened (see blog.trending). Every score decays
+    at the same rate, so ORDER BY score ranks by the current trending score.
+    """
+    __table_args__ = (
+        # Trending page: ORDER BY score DESC LIMIT n
+        db.Index("ix_post_trending_score_score", "score"),
+    )
+
+    post_id = db.Column(db.Integer, db.ForeignKey("post.id", ondelete="CASCADE"), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+    # Posts drop off the trending page once this leaves the trending window
+    last_viewed = db.Column(db.DateTime, nullable=False)
+
+class OutboxEmail(db.Model):
+    __table_args__ = (
+        # Worker scan: WHERE sent_at IS NULL AND next_attempt_at <= now ORDER BY id
+        db.Index("ix_outbox_email_pending", "sent_at", "next_attempt_at", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
@@ -0,0 +1,114 @@
+import smtplib
+import time
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from extensions import db, mail
+from models import OutboxEmail
+
+outbox_cli = AppGroup("outbox", help="Deliver queued outbound email.")
+
+def enqueue_email(recipient, subject, body):
+    """Queue an email for the outbox worker; committed with the caller's transaction"""
+    email = OutboxEmail(recipient=recipient, subject=subject, body=body)
+    db.session.add(email)
+    return email
+
+def _backoff(attempts):
+    base = current_app.config["MAIL_OUTBOX_RETRY_BASE"]
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), current_app.config["MAIL_OUTBOX_RETRY_MAX"]))
+
+def _mark_failed(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    email.next_attempt_at = now + _backoff(email.attempts)
+
+def _connection_lost(error):
+    # SMTPException subclasses OSError; only socket-level errors mean the connection is gone
+    return (isinstance(error, smtplib.SMTPServerDisconnected)
+            or (isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)))
+
+def drain_outbox(batch_size=None):
+    """Send one batch of due emails over a single SMTP connection.
+
+    Rows are claimed with FOR UPDATE SKIP LOCKED on PostgreSQL so several
+    workers can drain the same table. Returns (sent, failed).
+    """
+    batch_size = batch_size or current_app.config["MAIL_OUTBOX_BATCH_SIZE"]
+    now = datetime.utcnow()
+    batch = (OutboxEmail.query
+             .filter(OutboxEmail.sent_at.is_(None),
+                     OutboxEmail.next_attempt_at <= now,
+                     OutboxEmail.attempts < current_app.config["MAIL_OUTBOX_MAX_ATTEMPTS"])
+             .order_by(OutboxEmail.id)
+             .limit(batch_size)
+             .with_for_update(skip_locked=True)
+             .all())
+    if not batch:
+        db.session.commit()
+        return 0, 0
+
+    from flask_mail import Message
+    sent = failed = 0
+    smtp = ExitStack()
+    try:
+        conn = smtp.enter_context(mail.connect())
+    except (smtplib.SMTPException, OSError) as e:
+        # SMTP server unreachable: back the whole batch off
+        for email in batch:
+            _mark_failed(email, e, now)
+        db.session.commit()
+        return 0, len(batch)
+
+    try:
+        for email in batch:
+            try:
+                conn.send(Message(email.subject, recipients=[email.recipient], body=email.body))
+            except Exception as e:
+                # Refused recipients, encoding errors and the like only hold back this message
+                _mark_failed(email, e, now)
+                failed += 1
+                if _connection_lost(e):
+                    # The rest of the batch is picked up next pass
+                    break
+            else:
+                email.sent_at = datetime.utcnow()
+                sent += 1
+    finally:
+        try:
+            smtp.close()
+        except (smtplib.SMTPException, OSError):
+            pass
+        # Saved even if the loop is interrupted, so sent messages are never sent twice
+        db.session.commit()
+
+    return sent, failed
+
+@outbox_cli.command("drain")
+@click.option("--batch-size", type=int, default=None, help="Emails per SMTP connection.")
+def drain_command(batch_size):
+    """Send everything that is currently due, then exit."""
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = drain_outbox(batch_size)
+        total_sent += sent
+        total_failed += failed
+        if not sent:
+            break
+    click.echo(f"Sent {total_sent} email(s), {total_failed} failed.")
+
+@outbox_cli.command("worker")
+@click.option("--batch-size", type=int, default=None, help="Emails per SMTP connection.")
+@click.option("--interval", type=float, default=None, help="Seconds to sleep when the outbox is empty.")
+def worker_command(batch_size, interval):
+    """Continuously drain the outbox."""
+    interval = interval or current_app.config["MAIL_OUTBOX_POLL_INTERVAL"]
+    click.echo("Outbox worker started.")
+    while True:
+        sent, failed = drain_outbox(batch_size)
+        if sent or failed:
+            click.echo(f"Sent {sent} email(s), {failed} failed.")
+        if not sent:
+            time.sleep(interval)
@@ -0,0 +1,116 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_active_counters = ContextVar("active_query_counters", default=())
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+class QueryCount:
+    def __init__(self, keep_statements=True):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = [] if keep_statements else None
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    counters = _active_counters.get()
+    if not counters:
+        return
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+    for counter in counters:
+        counter.count += 1
+        if counter.statements is not None:
+            counter.statements.append(statement)
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query_time(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    for counter in _active_counters.get():
+        counter.duration += elapsed
+
+@event.listens_for(Engine, "handle_error")
+def _discard_failed_query(context):
+    starts = context.connection.info.get("query_start") if context.connection else None
+    if starts:
+        starts.pop()
+
+def start_counting(keep_statements=True):
+    """Start a counter for the current context; pass the token to stop_counting()"""
+    counter = QueryCount(keep_statements)
+    return counter, _active_counters.set(_active_counters.get() + (counter,))
+
+def stop_counting(token):
+    _active_counters.reset(token)
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed inside the block (nesting is allowed)"""
+    counter, token = start_counting()
+    try:
+        yield counter
+    finally:
+        stop_counting(token)
+
+def query_budget(limit):
+    """Declare the maximum number of queries a view may issue per request"""
+    def decorator(f):
+        f.query_budget = limit
+        return f
+    return decorator
+
+def _check_budget(counter, endpoint, limit):
+    if counter.count > limit:
+        raise QueryBudgetExceeded(
+            f"{endpoint} issued {counter.count} queries (budget {limit}):\n"
+            + "\n".join(counter.statements)
+        )
+
+def _checked_stream(body, counter, endpoint, limit):
+    # stream_with_context bodies query after the request's own counter has stopped
+    _active_counters.set(_active_counters.get() + (counter,))
+    try:
+        yield from body
+    finally:
+        _active_counters.set(tuple(active for active in _active_counters.get() if active is not counter))
+    _check_budget(counter, endpoint, limit)
+
+def init_query_budget(app):
+    """Fail requests whose query count exceeds their budget.
+
+    Only active when QUERY_BUDGET is set (tests, local debugging). A fixed
+    budget turns any N+1 regression into a hard failure as soon as a route
+    is exercised with more rows than the budget allows. Streamed responses
+    are checked once their body has been sent.
+    """
+    @app.before_request
+    def start_query_budget():
+        if current_app.config.get("QUERY_BUDGET"):
+            g._query_count, g._query_count_token = start_counting()
+
+    @app.after_request
+    def check_query_budget(response):
+        counter = g.get("_query_count")
+        if counter is None:
+            return response
+
+        view = current_app.view_functions.get(request.endpoint)
+        limit = getattr(view, "query_budget", current_app.config["QUERY_BUDGET"])
+        if response.is_streamed and not response.direct_passthrough:
+            response.response = _checked_stream(response.response, counter, request.endpoint, limit)
+        else:
+            _check_budget(counter, request.endpoint, limit)
+        return response
+
+    @app.teardown_request
+    def stop_query_budget(exc):
+        token = g.pop("_query_count_token", None)
+        if token is not None:
+            stop_counting(token)
@@ -0,0 +1,198 @@
+import math
+import re
+import threading
+import time
+from flask import current_app, g, request, session, jsonify, render_template
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+class RateLimitExceeded(Exception):
+    def __init__(self, limit, retry_after):
+        super().__init__(f"Rate limit exceeded: {limit}")
+        self.limit = limit
+        self.retry_after = retry_after
+
+class Limit:
+    def __init__(self, spec, scope="ip", methods=None):
+        match = re.fullmatch(r"\s*(\d+)\s*/\s*(second|minute|hour|day)\s*", spec)
+        if not match:
+            raise ValueError(f"Invalid rate limit {spec!r}, expected e.g. '10/minute'")
+        self.spec = spec
+        self.amount = int(match.group(1))
+        self.period = PERIODS[match.group(2)]
+        self.scope = scope
+        self.methods = tuple(methods) if methods else None
+
+    def __str__(self):
+        return self.spec
+
+def rate_limit(*specs, scope="ip", methods=None):
+    """Declare sliding-window limits for a view, e.g. @rate_limit("5/minute", "50/hour").
+
+    scope is "ip", "user" (session or JWT user, falling back to the IP) or a
+    callable returning the key, such as the submitted email address.
+    """
+    def decorator(f):
+        f.rate_limits = getattr(f, "rate_limits", []) + [Limit(spec, scope, methods) for spec in specs]
+        return f
+    return decorator
+
+class MemoryStore:
+    """Per-process counters; each gunicorn worker enforces its own share"""
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._windows = {}
+        self._hits = 0
+        self._lock = threading.Lock()
+
+    def hit(self, key, window, period):
+        """Count a hit in window and return (current, previous) window counts"""
+        with self._lock:
+            self._hits += 1
+            if self._hits % self.SWEEP_EVERY == 0:
+                self._sweep()
+            last_window, current, previous = self._windows.get(key, (window, 0, 0))
+            if last_window == window - 1:
+                current, previous = 0, current
+            elif last_window != window:
+                current, previous = 0, 0
+            current += 1
+            self._windows[key] = (window, current, previous)
+            return current, previous
+
+    def _sweep(self):
+        now = time.time()
+        for key, (window, _, _) in list(self._windows.items()):
+            period = int(key.rsplit(":", 1)[1])
+            if window < now // period - 1:
+                del self._windows[key]
+
+class RedisStore:
+    """Shared counters so limits hold across workers and hosts"""
+
+    def __init__(self, client, prefix="flaskblog:ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    def hit(self, key, window, period):
+        current_key = f"{self.prefix}{key}:{window}"
+        pipe = self.client.pipeline()
+        pipe.incr(current_key)
+        pipe.expire(current_key, period * 2)
+        pipe.get(f"{self.prefix}{key}:{window - 1}")
+        current, _, previous = pipe.execute()
+        return int(current), int(previous or 0)
+
+def _client_ip():
+    # Behind N trusted proxies the client is the Nth address from the right
+    # of X-Forwarded-For; anything further left may be forged by the client
+    hops = current_app.config.get("RATELIMIT_TRUSTED_PROXIES", 0)
+    if hops:
+        forwarded = [addr.strip() for addr in request.headers.get("X-Forwarded-For", "").split(",")]
+        forwarded = [addr for addr in forwarded if addr]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.remote_addr or "unknown"
+
+def _current_user():
+    if "user_id" in session:
+        return session["user_id"]
+    try:
+        if verify_jwt_in_request(optional=True):
+            return get_jwt_identity()
+    except Exception:
+        # Invalid tokens are rejected by the view itself; limit them by IP
+        pass
+    return None
+
+def _scope_key(limit):
+    if callable(limit.scope):
+        value = limit.scope()
+        return f"key={value}" if value else f"ip={_client_ip()}"
+    if limit.scope == "user":
+        user_id = _current_user()
+        return f"user={user_id}" if user_id is not None else f"ip={_client_ip()}"
+    return f"ip={_client_ip()}"
+
+class RateLimiter:
+    """Sliding-window counter limiter driven by @rate_limit declarations.
+
+    Each limit keeps a counter for the current and previous fixed window and
+    weights the previous one by how much of it still overlaps the sliding
+    window, which approximates a true sliding log with two integers per key.
+    """
+
+    def __init__(self):
+        self.store = MemoryStore()
+        self.enabled = False
+
+    def init_app(self, app):
+        self.enabled = app.config.get("RATELIMIT_ENABLED", True)
+        if app.config.get("RATELIMIT_STORAGE") == "redis":
+            import redis
+            self.store = RedisStore(redis.Redis.from_url(app.config["RATELIMIT_REDIS_URL"]))
+        else:
+            self.store = MemoryStore()
+        app.extensions["ratelimit"] = self
+
+        app.before_request(self._check)
+        app.after_request(self._add_headers)
+        app.register_error_handler(RateLimitExceeded, self._too_many_requests)
+
+    def _check(self):
+        if not self.enabled:
+            return
+        view = current_app.view_functions.get(request.endpoint)
+        limits = [limit for limit in getattr(view, "rate_limits", ())
+                  if limit.methods is None or request.method in limit.methods]
+        if not limits:
+            return
+
+        now = time.time()
+        tightest = None
+        for limit in limits:
+            window = int(now // limit.period)
+            elapsed = now - window * limit.period
+            key = f"{request.endpoint}:{_scope_key(limit)}:{limit.period}"
+            current, previous = self.store.hit(key, window, limit.period)
+            weighted = previous * (limit.period - elapsed) / limit.period + current
+
+            if weighted > limit.amount:
+                raise RateLimitExceeded(limit, self._retry_after(limit, elapsed, current, previous))
+            remaining = int(limit.amount - math.ceil(weighted))
+            if tightest is None or remaining < tightest[1]:
+                tightest = (limit, remaining, math.ceil(limit.period - elapsed))
+        g._rate_limit = tightest
+
+    @staticmethod
+    def _retry_after(limit, elapsed, current, previous):
+        # Time until the weighted count drops back under the limit
+        to_window_end = limit.period - elapsed
+        if current >= limit.amount:
+            wait = to_window_end + limit.period * (1 - limit.amount / current)
+        else:
+            wait = to_window_end - (limit.amount - current) * limit.period / previous
+        return max(1, math.ceil(wait))
+
+    def _add_headers(self, response):
+        state = g.pop("_rate_limit", None)
+        if state is not None:
+            limit, remaining, reset = state
+            response.headers["X-RateLimit-Limit"] = str(limit.amount)
+            response.headers["X-RateLimit-Remaining"] = str(max(0, remaining))
+            response.headers["X-RateLimit-Reset"] = str(reset)
+        return response
+
+    def _too_many_requests(self, e):
+        headers = {
+            "Retry-After": str(e.retry_after),
+            "X-RateLimit-Limit": str(e.limit.amount),
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": str(e.retry_after),
+        }
+        if "/api/" in request.path:
+            return jsonify({'error': 'Too many requests', 'retry_after': e.retry_after}), 429, headers
+        return render_template("429.html", retry_after=e.retry_after), 429, headers
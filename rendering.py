@@ -0,0 +1,104 @@
+import hashlib
+import click
+from flask.cli import AppGroup, with_appcontext
+from markupsafe import Markup
+from sqlalchemy import bindparam, or_, select, update
+from cache import SimpleCache
+
+markdown_cli = AppGroup("markdown", help="Stored Markdown rendering helpers.")
+
+# What Markdown can produce, minus raw HTML we don't want from users
+ALLOWED_TAGS = {
+    "a", "abbr", "blockquote", "br", "code", "del", "em", "h1", "h2", "h3", "h4", "h5", "h6",
+    "hr", "img", "li", "ol", "p", "pre", "strong", "table", "tbody", "td", "th", "thead", "tr", "ul",
+}
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "abbr": {"title"},
+    "img": {"src", "alt", "title"},
+    "th": {"align"},
+    "td": {"align"},
+}
+MARKDOWN_EXTENSIONS = ["fenced_code", "tables", "sane_lists"]
+
+def content_hash(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+class MarkdownRenderer:
+    """Renders user Markdown to sanitized HTML, memoized by content hash.
+
+    Posts and comments store the result next to their source when they are
+    written, so views only read it back. The per-process LRU catches the rest:
+    rows written before rendering existed and repeated content such as bulk
+    imports. markdown and nh3 are imported on first use.
+    """
+
+    def __init__(self):
+        self.cache = SimpleCache(1024)
+
+    def init_app(self, app):
+        self.cache = SimpleCache(app.config.get("MARKDOWN_CACHE_SIZE", 1024))
+        app.extensions["markdown_renderer"] = self
+
+    def _render(self, text):
+        import markdown
+        import nh3
+        html = markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS, output_format="html")
+        return nh3.clean(html, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES,
+                         url_schemes={"http", "https", "mailto"}, link_rel="nofollow noopener")
+
+    def render(self, text):
+        """(content hash, sanitized HTML) for Markdown source text"""
+        key = content_hash(text)
+        html = self.cache.get(key)
+        if html is None:
+            html = self._render(text or "")
+            self.cache.set(key, html, None)
+        return key, html
+
+    def html(self, text, stored=None):
+        """Markup for a model's content, using the stored rendering when there is one"""
+        return Markup(stored if stored is not None else self.render(text)[1])
+
+def backfill_renderings(batch_size=1000):
+    """Store renderings for posts and comments saved without one.
+
+    Covers rows written before rendering was stored and rows inserted with
+    raw SQL. Each table is walked by id and every batch is committed, so an
+    interrupted run can simply be repeated. updated_at is kept: the page
+    looks the same, it just stops being rendered per request. Returns
+    {table name: rows rendered}.
+    """
+    from extensions import db, markdown_renderer
+    from models import Comment, Post
+    rendered = {}
+    for model in (Post, Comment):
+        table = model.__table__
+        missing = or_(table.c.content_html.is_(None), table.c.content_hash.is_(None))
+        stmt = (update(table).where(table.c.id == bindparam("row_id"))
+                .values(content_hash=bindparam("key"), content_html=bindparam("rendered"),
+                        updated_at=table.c.updated_at))
+        last_id, count = 0, 0
+        while True:
+            rows = db.session.execute(select(table.c.id, table.c.content)
+                                      .where(table.c.id > last_id, missing)
+                                      .order_by(table.c.id).limit(batch_size)).all()
+            if not rows:
+                break
+            values = []
+            for row_id, content in rows:
+                key, html = markdown_renderer.render(content)
+                values.append({"row_id": row_id, "key": key, "rendered": html})
+            db.session.execute(stmt, values)
+            db.session.commit()
+            last_id, count = rows[-1].id, count + len(rows)
+        rendered[table.name] = count
+    return rendered
+
+@markdown_cli.command("backfill")
+@click.option("--batch-size", type=int, default=1000, show_default=True)
+@with_appcontext
+def backfill_command(batch_size):
+    """Render and store Markdown for rows that have no stored HTML."""
+    for table, count in backfill_renderings(batch_size).items():
+        click.echo(f"Rendered {count} {table} row(s).")
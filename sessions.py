@@ -0,0 +1,187 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from flask.sessions import SessionInterface, SessionMixin
+from flask.json.tag import TaggedJSONSerializer
+from itsdangerous import Signer, BadSignature
+from werkzeug.datastructures import CallbackDict
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires = expires
+        self.new = new
+        self.modified = False
+        # Id the data was stored under before regenerate(); deleted on save
+        self.stale_sid = None
+
+    def regenerate(self):
+        """Move the data to a fresh id, e.g. on login, so a planted or leaked id stays anonymous"""
+        if not self.new and self.stale_sid is None:
+            self.stale_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.modified = True
+
+class SqliteSessionStore:
+    """Sessions in a local SQLite file; fine for one host, not shared between hosts"""
+
+    SWEEP_EVERY = 500
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS session (sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        # One connection per thread (and per forked worker)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, sid):
+        return self._connect().execute(
+            "SELECT data, expires FROM session WHERE sid = ? AND expires > ?", (sid, time.time())
+        ).fetchone()
+
+    def set(self, sid, data, expires):
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO session (sid, data, expires) VALUES (?, ?, ?)", (sid, data, expires))
+        self._writes += 1
+        if self._writes % self.SWEEP_EVERY == 0:
+            conn.execute("DELETE FROM session WHERE expires <= ?", (time.time(),))
+
+    def delete(self, sid):
+        self._connect().execute("DELETE FROM session WHERE sid = ?", (sid,))
+
+class RedisSessionStore:
+    """Shared store for several hosts; Redis expires the keys itself"""
+
+    def __init__(self, client, prefix="flaskblog:session:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, sid):
+        pipe = self.client.pipeline()
+        pipe.get(self.prefix + sid)
+        pipe.ttl(self.prefix + sid)
+        data, ttl = pipe.execute()
+        if data is None:
+            return None
+        return (data.decode("utf-8") if isinstance(data, bytes) else data), time.time() + max(ttl, 0)
+
+    def set(self, sid, data, expires):
+        self.client.set(self.prefix + sid, data, ex=max(1, int(expires - time.time())))
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keeps session data server side; the cookie only carries a signed random id.
+
+    The store is written when the session changes, and for unchanged
+    sessions only once half of their lifetime has passed, so ordinary page
+    views don't cost a write.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt="server-side-session")
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+        signed = request.cookies.get(self.get_cookie_name(app))
+        if signed:
+            try:
+                sid = self._signer(app).unsign(signed).decode("ascii")
+            except BadSignature:
+                sid = None
+            if sid:
+                row = self.store.get(sid)
+                if row is not None:
+                    data, expires = row
+                    return ServerSideSession(self.serializer.loads(data), sid=sid, expires=expires)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.stale_sid is not None:
+            self.store.delete(session.stale_sid)
+            session.stale_sid = None
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        now = time.time()
+        refresh = (session.permanent and self.should_set_cookie(app, session)
+                   and session.expires is not None and session.expires - now < lifetime / 2)
+        if not (session.modified or session.new or refresh):
+            return
+
+        expires = now + lifetime
+        self.store.set(session.sid, self.serializer.dumps(dict(session)), expires)
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode("ascii"),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+        response.vary.add("Cookie")
+
+def regenerate_session(session):
+    """Issue a new session id when the session's privilege level changes.
+
+    Signed-cookie sessions carry their data in the cookie, so they have no
+    server-side id to fixate and are left as they are.
+    """
+    regenerate = getattr(session, "regenerate", None)
+    if regenerate is not None:
+        regenerate()
+
+def init_sessions(app):
+    """Install the server-side session store chosen by SESSION_STORE.
+
+    "sqlite" (default) keeps sessions in SESSION_SQLITE_PATH, "redis" in
+    SESSION_REDIS_URL and "cookie" keeps Flask's signed-cookie sessions.
+    """
+    store_type = app.config.get("SESSION_STORE", "sqlite")
+    if store_type == "cookie":
+        return
+    if store_type == "redis":
+        import redis
+        store = RedisSessionStore(redis.Redis.from_url(app.config["SESSION_REDIS_URL"]))
+    else:
+        path = app.config.get("SESSION_SQLITE_PATH") or os.path.join(app.instance_path, "sessions.sqlite3")
+        store = SqliteSessionStore(path)
+    app.session_interface = ServerSideSessionInterface(store)
@@ -0,0 +1,71 @@
+import os
+import pytest
+from flask_jwt_extended import create_access_token
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+TEST_ENV = {
+    "APP_SECRET_KEY": "test-secret",
+    "JWT_SECRET_KEY": "test-jwt-secret-that-is-long-enough",
+    "HASHING_POOL_SIZE": "0",
+    "BCRYPT_LOG_ROUNDS": "4",
+    # Every route runs under its @query_budget (or this default)
+    "QUERY_BUDGET": "5",
+    "RATELIMIT_ENABLED": "0",
+    "CACHE_TYPE": "null",
+    "SESSION_STORE": "cookie",
+    "JINJA_BYTECODE_CACHE": "0",
+    "LAST_LOGIN_WRITE_BEHIND": "0",
+    "USER_CACHE_TIMEOUT": "0",
+    "COMPRESS_ENABLED": "0",
+}
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Build an app on a migrated SQLite database in tmp_path; keyword args override env vars"""
+    from extensions import last_logins, view_counter
+
+    def make(**env):
+        monkeypatch.delenv("DATABASE_REPLICA_URI", raising=False)
+        settings = {**TEST_ENV, "DATABASE_URI": f"sqlite:///{tmp_path / 'blog.db'}", **env}
+        for name, value in settings.items():
+            monkeypatch.setenv(name, value)
+
+        from app import create_app
+        from extensions import migrate
+        from flask_migrate import upgrade
+        app = create_app()
+        app.testing = True
+        with app.app_context():
+            migrate.load()
+            upgrade(directory=MIGRATIONS)
+        return app
+
+    yield make
+    # Buffered writes must not outlive the test database
+    view_counter._pending.clear()
+    last_logins._pending.clear()
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def make_user(session, name, **kwargs):
+    """Add and commit a confirmed user; returns its id"""
+    from models import User
+    user = User(name=name, email=f"{name}@example.com", confirmed=True, **kwargs)
+    session.add(user)
+    session.commit()
+    return user.id
+
+def auth_headers(app, user_id):
+    with app.app_context():
+        return {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+
+def log_in(client, user_id):
+    with client.session_transaction() as session:
+        session["user_id"] = user_id
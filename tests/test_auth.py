@@ -0,0 +1,17 @@
+from conftest import make_user
+
+def test_api_login_token_opens_protected_routes(app, client):
+    from extensions import db, hasher
+    with app.app_context():
+        make_user(db.session, "writer", password=hasher.generate_password_hash("secret"))
+
+    response = client.post("/auth/api/login", json={"email": "writer@example.com", "password": "secret"})
+    assert response.status_code == 200
+    headers = {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+    response = client.post("/api/posts", json={"title": "mine", "content": "body"}, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    response = client.get("/api/my-posts", headers=headers)
+    assert response.status_code == 200
+    assert [post["title"] for post in response.get_json()["posts"]] == ["mine"]
+    assert client.get("/auth/api/profile", headers=headers).get_json()["user"]["name"] == "writer"
@@ -0,0 +1,121 @@
+import json
+import pytest
+from conftest import auth_headers, make_user
+
+def seed_source(app):
+    from extensions import db
+    from models import Comment, Post
+    with app.app_context():
+        alice, bob = make_user(db.session, "alice"), make_user(db.session, "bob")
+        public = Post(title="Public", content="*hello*", user_id=alice)
+        private = Post(title="Private", content="secret", user_id=bob, is_public=False)
+        db.session.add_all([public, private])
+        db.session.flush()
+        top = Comment(content="on public", user_id=bob, post_id=public.id, reply_count=1)
+        db.session.add_all([top, Comment(content="on private", user_id=alice, post_id=private.id)])
+        db.session.flush()
+        reply = Comment(content="reply", user_id=alice, post_id=public.id, parent_id=top.id, reply_count=1)
+        db.session.add(reply)
+        db.session.flush()
+        db.session.add(Comment(content="nested", user_id=bob, post_id=public.id, parent_id=reply.id))
+        public.comment_count, private.comment_count = 3, 1
+        db.session.commit()
+
+def run(app, *args):
+    result = app.test_cli_runner().invoke(args=["bulk", *args])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+def snapshot(app):
+    from extensions import db
+    from models import Post
+    with app.app_context():
+        posts = db.session.scalars(db.select(Post).where(Post.title != "Unrelated").order_by(Post.title))
+        return [(post.title, post.content, post.author.name, post.is_public, post.comment_count,
+                 sorted((comment.content, comment.author.name, comment.parent and comment.parent.content,
+                         comment.reply_count) for comment in post.comments))
+                for post in posts]
+
+@pytest.mark.parametrize("batch_size", ["1", "1000"])
+def test_export_import_round_trip(make_app, tmp_path, batch_size):
+    source = make_app()
+    seed_source(source)
+    (tmp_path / "posts.ndjson").write_text(run(source, "export-posts", "--include-private"))
+    (tmp_path / "comments.ndjson").write_text(run(source, "export-comments", "--include-private"))
+    expected = snapshot(source)
+
+    target = make_app(DATABASE_URI=f"sqlite:///{tmp_path / 'target.db'}")
+    from extensions import db
+    from models import Post
+    with target.app_context():
+        alice, bob = make_user(db.session, "alice"), make_user(db.session, "bob")
+        # Shifts the new post ids away from the exported ones
+        db.session.add(Post(title="Unrelated", content="x", user_id=alice))
+        db.session.commit()
+
+    id_map = tmp_path / "ids.json"
+    run(target, "import-posts", str(tmp_path / "posts.ndjson"), "--id-map", str(id_map))
+    run(target, "import-comments", str(tmp_path / "comments.ndjson"), "--post-id-map", str(id_map),
+        "--batch-size", batch_size)
+
+    assert snapshot(target) == expected
+    assert len(json.loads(id_map.read_text())) == 2
+
+def test_bad_lines_are_reported_not_fatal(app):
+    from blog.bulk import import_posts
+    from extensions import db
+    lines = [
+        b'{"title": "ok", "content": "fine"}\n',
+        b'\xff\xfe not utf-8\n',
+        b'{"title": "string flag", "content": "x", "is_public": "false"}\n',
+        b'{"title": "unknown author", "content": "x", "author_id": 999}\n',
+    ]
+    with app.app_context():
+        user_id = make_user(db.session, "importer")
+        report = import_posts(lines, user_id=user_id, trusted=True)
+    assert report.imported == 1
+    assert [error["line"] for error in report.errors] == [2, 3, 4]
+    assert "must be true or false" in report.errors[1]["error"]
+
+def test_api_export_requires_a_token(app, client):
+    from extensions import db
+    with app.app_context():
+        user_id = make_user(db.session, "reader")
+    for url in ("/api/bulk/posts", "/api/bulk/comments", "/api/bulk/my-posts"):
+        assert client.get(url).status_code == 401
+        assert client.get(url, headers=auth_headers(app, user_id)).status_code == 200
+
+def test_api_import_belongs_to_the_caller(app, client):
+    from extensions import db
+    with app.app_context():
+        user_id = make_user(db.session, "uploader")
+        other = make_user(db.session, "other")
+    body = json.dumps({"id": 7, "title": "mine", "content": "x", "author_id": other}) + "\n"
+    response = client.post("/api/bulk/posts", data=body, headers=auth_headers(app, user_id))
+    assert response.status_code == 201
+    report = response.get_json()
+    assert report["imported"] == 1 and list(report["id_map"]) == ["7"]
+    posts = client.get("/api/bulk/my-posts", headers=auth_headers(app, user_id)).get_data(as_text=True)
+    assert [json.loads(line)["author_id"] for line in posts.splitlines()] == [user_id]
+
+def test_replies_to_existing_comments(app):
+    from blog.bulk import import_comments
+    from extensions import db
+    from models import Comment, Post
+    with app.app_context():
+        user_id = make_user(db.session, "replier")
+        post, other = Post(title="a", content="x", user_id=user_id), Post(title="b", content="x", user_id=user_id)
+        db.session.add_all([post, other])
+        db.session.flush()
+        parent = Comment(content="parent", user_id=user_id, post_id=post.id)
+        db.session.add(parent)
+        db.session.commit()
+        lines = [json.dumps(record) + "\n" for record in (
+            {"content": "reply", "post_id": post.id, "parent_id": parent.id},
+            {"content": "wrong post", "post_id": other.id, "parent_id": parent.id},
+            {"content": "missing", "post_id": post.id, "parent_id": 999},
+        )]
+        report = import_comments(lines, user_id=user_id)
+        assert report.imported == 1 and [error["line"] for error in report.errors] == [2, 3]
+        db.session.refresh(parent)
+        assert parent.reply_count == 1 and [reply.content for reply in parent.replies] == ["reply"]
@@ -0,0 +1,48 @@
+import pytest
+from conftest import auth_headers, log_in, make_user
+
+def seed_thread(app, comments):
+    """A post with `comments` top-level comments, each with a nested reply chain of two"""
+    from extensions import db
+    from models import Comment, Post
+    with app.app_context():
+        author = make_user(db.session, "author")
+        post = Post(title="Thread", content="needle", user_id=author)
+        db.session.add(post)
+        db.session.flush()
+        for _ in range(comments):
+            top = Comment(content="top", user_id=author, post_id=post.id, reply_count=1)
+            db.session.add(top)
+            db.session.flush()
+            reply = Comment(content="reply", user_id=author, post_id=post.id, parent_id=top.id, reply_count=1)
+            db.session.add(reply)
+            db.session.flush()
+            db.session.add(Comment(content="nested", user_id=author, post_id=post.id, parent_id=reply.id))
+        other = Post(title="Other", content="x", user_id=author)
+        db.session.add(other)
+        db.session.flush()
+        db.session.add(Comment(content="kept", user_id=author, post_id=other.id))
+        post.comment_count = comments * 3
+        db.session.commit()
+        return author, post.id
+
+def remaining(app):
+    from extensions import db
+    from models import Comment, Post
+    with app.app_context():
+        return (db.session.scalars(db.select(Post.title)).all(),
+                db.session.scalars(db.select(Comment.content)).all())
+
+@pytest.mark.parametrize("comments", [1, 20])
+def test_form_delete_removes_the_thread(app, client, comments):
+    author, post_id = seed_thread(app, comments)
+    log_in(client, author)
+    # Held to @query_budget however long the thread is
+    assert client.post(f"/delete/{post_id}").status_code == 302
+    assert remaining(app) == (["Other"], ["kept"])
+
+@pytest.mark.parametrize("comments", [1, 20])
+def test_api_delete_removes_the_thread(app, client, comments):
+    author, post_id = seed_thread(app, comments)
+    assert client.delete(f"/api/posts/{post_id}", headers=auth_headers(app, author)).status_code == 200
+    assert remaining(app) == (["Other"], ["kept"])
@@ -0,0 +1,33 @@
+import pytest
+from conftest import auth_headers, log_in, make_user
+
+@pytest.fixture
+def app(make_app):
+    return make_app(CACHE_TYPE="simple")
+
+@pytest.fixture
+def post_id(app):
+    from extensions import db
+    from models import Post
+    with app.app_context():
+        post = Post(title="Cached", content="body", user_id=make_user(db.session, "author"))
+        db.session.add(post)
+        db.session.commit()
+        return post.id
+
+def comment_count(client):
+    response = client.get("/api/posts")
+    return response.headers["X-Cache"], response.get_json()["posts"][0]["comment_count"]
+
+def test_new_comment_refreshes_cached_counts(app, client, post_id):
+    assert comment_count(client) == ("MISS", 0)
+    assert comment_count(client) == ("HIT", 0)
+
+    response = client.post(f"/api/posts/{post_id}/comments", json={"content": "hi"},
+                           headers=auth_headers(app, 1))
+    assert response.status_code == 201
+    assert comment_count(client) == ("MISS", 1)
+
+    log_in(client, 1)
+    client.post(f"/post/{post_id}", data={"content": "again"})
+    assert comment_count(client) == ("MISS", 2)
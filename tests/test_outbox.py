@@ -0,0 +1,161 @@
+import socket
+from datetime import datetime, timedelta
+import pytest
+from aiosmtpd.controller import Controller
+
+class Inbox:
+    """aiosmtpd handler standing in for the SMTP server; refuses bad@ recipients"""
+
+    def __init__(self, port):
+        self.port = port
+        self.messages = []
+
+    @property
+    def recipients(self):
+        return [address for envelope in self.messages for address in envelope.rcpt_tos]
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("bad@"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 Message accepted"
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def inbox():
+    handler = Inbox(free_port())
+    controller = Controller(handler, hostname="127.0.0.1", port=handler.port)
+    controller.start()
+    yield handler
+    controller.stop()
+
+def configure_mail(app, port):
+    from extensions import mail
+    app.config.update(MAIL_SERVER="127.0.0.1", MAIL_PORT=port, MAIL_USE_TLS=False,
+                      MAIL_SUPPRESS_SEND=False, MAIL_DEFAULT_SENDER="blog@example.com",
+                      MAIL_OUTBOX_RETRY_BASE=30, MAIL_OUTBOX_RETRY_MAX=3600)
+    # Flask-Mail reads its settings in init_app
+    mail.init_app(app)
+
+@pytest.fixture
+def mail_app(app, inbox):
+    configure_mail(app, inbox.port)
+    with app.app_context():
+        yield app
+
+def queue(*recipients, subject="Hello"):
+    from extensions import db
+    from outbox import enqueue_email
+    emails = [enqueue_email(recipient, subject, "body") for recipient in recipients]
+    db.session.commit()
+    return [email.id for email in emails]
+
+def row(email_id):
+    from extensions import db
+    from models import OutboxEmail
+    db.session.expire_all()
+    return db.session.get(OutboxEmail, email_id)
+
+def make_due(email_id):
+    from extensions import db
+    row(email_id).next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+def test_sends_due_emails_once(mail_app, inbox):
+    from outbox import drain_outbox
+    ids = queue("a@example.com", "b@example.com", "c@example.com")
+
+    assert drain_outbox() == (3, 0)
+    assert inbox.recipients == ["a@example.com", "b@example.com", "c@example.com"]
+    assert all(row(email_id).sent_at for email_id in ids)
+
+    assert drain_outbox() == (0, 0)
+    assert len(inbox.messages) == 3
+
+def test_refused_recipient_backs_off_without_stopping_the_batch(mail_app, inbox):
+    from outbox import drain_outbox
+    good, bad, later = queue("a@example.com", "bad@example.com", "c@example.com")
+
+    before = datetime.utcnow()
+    assert drain_outbox() == (2, 1)
+    assert inbox.recipients == ["a@example.com", "c@example.com"]
+    failed = row(bad)
+    assert failed.sent_at is None and failed.attempts == 1 and "No such user" in failed.last_error
+    assert failed.next_attempt_at >= before + timedelta(seconds=30)
+
+    # Not due yet, then retried with a doubled delay
+    assert drain_outbox() == (0, 0)
+    make_due(bad)
+    before = datetime.utcnow()
+    assert drain_outbox() == (0, 1)
+    assert row(bad).attempts == 2
+    assert row(bad).next_attempt_at >= before + timedelta(seconds=60)
+
+def test_gives_up_after_max_attempts(mail_app, inbox):
+    from outbox import drain_outbox
+    mail_app.config["MAIL_OUTBOX_MAX_ATTEMPTS"] = 2
+    (bad,) = queue("bad@example.com")
+    for _ in range(2):
+        make_due(bad)
+        assert drain_outbox() == (0, 1)
+    make_due(bad)
+    assert drain_outbox() == (0, 0)
+    assert row(bad).attempts == 2
+
+def test_unexpected_error_only_fails_that_message(mail_app, inbox, monkeypatch):
+    import flask_mail
+    from outbox import drain_outbox
+    real_message = flask_mail.Message
+
+    def message(subject, **kwargs):
+        if subject == "broken":
+            raise UnicodeEncodeError("ascii", subject, 0, 1, "bad template")
+        return real_message(subject, **kwargs)
+
+    monkeypatch.setattr(flask_mail, "Message", message)
+    first, = queue("a@example.com")
+    broken, = queue("b@example.com", subject="broken")
+    last, = queue("c@example.com")
+
+    assert drain_outbox() == (2, 1)
+    assert row(first).sent_at and row(last).sent_at
+    assert row(broken).sent_at is None and row(broken).attempts == 1
+    assert inbox.recipients == ["a@example.com", "c@example.com"]
+
+def test_interrupted_drain_keeps_sent_markers(mail_app, inbox, monkeypatch):
+    import flask_mail
+    from outbox import drain_outbox
+    real_message = flask_mail.Message
+
+    def message(subject, **kwargs):
+        if subject == "stop":
+            raise KeyboardInterrupt
+        return real_message(subject, **kwargs)
+
+    monkeypatch.setattr(flask_mail, "Message", message)
+    first, = queue("a@example.com")
+    queue("b@example.com", subject="stop")
+
+    with pytest.raises(KeyboardInterrupt):
+        drain_outbox()
+    assert row(first).sent_at is not None
+
+    monkeypatch.setattr(flask_mail, "Message", real_message)
+    assert drain_outbox() == (1, 0)
+    assert inbox.recipients == ["a@example.com", "b@example.com"]
+
+def test_unreachable_server_backs_off_the_batch(app):
+    from outbox import drain_outbox
+    configure_mail(app, free_port())
+    with app.app_context():
+        ids = queue("a@example.com", "b@example.com")
+        assert drain_outbox() == (0, 2)
+        assert all(row(email_id).attempts == 1 and row(email_id).sent_at is None for email_id in ids)
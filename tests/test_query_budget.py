@@ -0,0 +1,94 @@
+import pytest
+from conftest import auth_headers, log_in, make_user
+from querycount import count_queries
+
+SMALL, LARGE = 5, 50
+
+ROUTES = [
+    "/",
+    "/api/posts",
+    "/api/posts?stream=1&limit=500",
+    "/post/{post}",
+    "/api/posts/{post}/comments",
+    "/api/posts/{post}/comments?stream=1&limit=500",
+    "/search?q=needle",
+    "/api/search?q=needle",
+    "/trending",
+    "/api/posts/trending",
+    "/feed",
+    "/api/feed",
+    "/profile",
+    "/my-posts",
+    "/api/my-posts",
+    "/api/my-posts?stream=1&limit=500",
+]
+
+class Seeder:
+    """Grows every listing by one row per author: posts, comments, follows, timelines, views.
+
+    Each call runs in its own app context so requests never share its session.
+    """
+
+    def __init__(self, app):
+        from extensions import db
+        from models import Post
+        self.app = app
+        self.authors = 0
+        with app.app_context():
+            self.reader = make_user(db.session, "reader")
+            post = Post(title="Thread", content="needle thread", user_id=self.reader)
+            db.session.add(post)
+            db.session.commit()
+            self.post = post.id
+
+    def add(self, count):
+        from extensions import db
+        from blog.timeline import fan_out, follow
+        from blog.trending import record_views
+        from models import Comment, Post
+        with self.app.app_context():
+            for _ in range(count):
+                self.authors += 1
+                author = make_user(db.session, f"author{self.authors}")
+                follow(self.reader, author)
+                post = Post(title=f"Post {self.authors}", content=f"needle *{self.authors}*", user_id=author)
+                own = Post(title=f"Own {self.authors}", content="needle", user_id=self.reader)
+                db.session.add_all([post, own])
+                fan_out(post)
+                comment = Comment(content="first", user_id=author, post_id=self.post, reply_count=1)
+                db.session.add(comment)
+                db.session.flush()
+                db.session.add(Comment(content="reply", user_id=self.reader, post_id=self.post,
+                                       parent_id=comment.id))
+                record_views({post.id: self.authors})
+                db.session.commit()
+
+def queries_for(client, url, headers):
+    with count_queries() as counter:
+        response = client.get(url, headers=headers)
+        # Streamed bodies run their queries while being read
+        response.get_data()
+    assert response.status_code == 200, (url, response.status_code)
+    return counter.count
+
+@pytest.mark.parametrize("route", ROUTES)
+def test_query_count_does_not_grow_with_rows(app, client, route):
+    seeder = Seeder(app)
+    url = route.format(post=seeder.post)
+    log_in(client, seeder.reader)
+    headers = auth_headers(app, seeder.reader)
+
+    seeder.add(SMALL)
+    small = queries_for(client, url, headers)
+    seeder.add(LARGE - SMALL)
+    large = queries_for(client, url, headers)
+    assert large == small, f"{url}: {small} queries for {SMALL} rows, {large} for {LARGE}"
+
+def test_streamed_body_is_held_to_the_budget(app, client, monkeypatch):
+    from querycount import QueryBudgetExceeded
+    from models import Post
+    Seeder(app).add(SMALL)
+    # Lazy-loading each post's comments turns the streamed listing into an N+1
+    monkeypatch.setattr(Post, "to_dict", lambda post: {"comments": len(post.comments)})
+    with pytest.raises(QueryBudgetExceeded):
+        client.get("/api/posts?stream=1&limit=500").get_data()
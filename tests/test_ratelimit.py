@@ -0,0 +1,28 @@
+import pytest
+
+@pytest.fixture
+def login_attempts(make_app):
+    def attempts(client_ips, **env):
+        app = make_app(RATELIMIT_ENABLED="1", **env)
+        client = app.test_client()
+        statuses = []
+        for ip in client_ips:
+            # Every request arrives from the proxy at 10.0.0.1
+            response = client.post("/auth/api/login", json={"email": f"{ip}@example.com", "password": "x"},
+                                   headers={"X-Forwarded-For": ip}, environ_base={"REMOTE_ADDR": "10.0.0.1"})
+            statuses.append(response.status_code)
+        return statuses
+    return attempts
+
+def test_without_trusted_proxies_clients_share_the_proxy_address(login_attempts):
+    statuses = login_attempts([f"203.0.113.{n}" for n in range(11)])
+    assert statuses[-1] == 429
+
+def test_trusted_proxy_limits_each_client(login_attempts):
+    statuses = login_attempts([f"203.0.113.{n}" for n in range(11)] * 2, RATELIMIT_TRUSTED_PROXIES="1")
+    assert 429 not in statuses
+
+def test_forged_forwarded_for_is_ignored(login_attempts):
+    # The client prepends random addresses; the proxy appends the real one
+    statuses = login_attempts([f"198.51.100.{n}, 203.0.113.7" for n in range(11)], RATELIMIT_TRUSTED_PROXIES="1")
+    assert statuses[-1] == 429
@@ -0,0 +1,69 @@
+import shutil
+import sqlite3
+import pytest
+from conftest import auth_headers, log_in, make_user
+
+@pytest.fixture
+def replica_app(make_app, tmp_path):
+    """Primary and replica SQLite files; the replica starts as a copy of the migrated primary"""
+    primary, replica = tmp_path / "blog.db", tmp_path / "replica.db"
+    app = make_app(DATABASE_REPLICA_URI=f"sqlite:///{replica}")
+    shutil.copy(primary, replica)
+    return app
+
+def insert_post(path, title, user_id=1):
+    """Write straight into one database file, bypassing the app"""
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT OR IGNORE INTO user (id, name, email, follower_count) VALUES (?, 'r', 'r@example.com', 0)",
+                     (user_id,))
+        conn.execute("INSERT INTO post (title, content, excerpt, timestamp, updated_at, user_id, is_public, "
+                     "comment_count, view_count) VALUES (?, 'x', 'x', datetime('now'), datetime('now'), ?, 1, 0, 0)",
+                     (title, user_id))
+
+def titles(response):
+    return [post["title"] for post in response.get_json()["posts"]]
+
+def test_read_views_use_the_replica(replica_app, tmp_path):
+    insert_post(tmp_path / "replica.db", "only on the replica")
+    client = replica_app.test_client()
+    assert titles(client.get("/api/posts")) == ["only on the replica"]
+
+def test_views_without_read_replica_use_the_primary(replica_app):
+    from datetime import datetime, timedelta
+    from extensions import db
+    with replica_app.app_context():
+        user_id = make_user(db.session, "owner", reset_token="token",
+                            reset_token_expiry=datetime.utcnow() + timedelta(hours=1))
+    client = replica_app.test_client()
+
+    # The user only exists on the primary
+    assert client.get("/auth/api/profile", headers=auth_headers(replica_app, user_id)).status_code == 404
+    assert client.get("/auth/reset-password/token").status_code == 200
+
+def test_writes_go_to_the_primary_and_pin_reads(replica_app, tmp_path):
+    from extensions import db
+    with replica_app.app_context():
+        user_id = make_user(db.session, "writer")
+    headers = auth_headers(replica_app, user_id)
+    writer, other = replica_app.test_client(), replica_app.test_client()
+
+    response = writer.post("/api/posts", json={"title": "new", "content": "body"}, headers=headers)
+    assert response.status_code == 201
+    assert writer.get_cookie("read_primary_until") is not None
+
+    # The writer reads its own write from the primary; everyone else still reads the replica
+    assert titles(writer.get("/api/posts")) == ["new"]
+    assert titles(other.get("/api/posts")) == []
+
+def test_unfollow_pins_reads(replica_app):
+    from blog.timeline import follow
+    from extensions import db
+    with replica_app.app_context():
+        reader, author = make_user(db.session, "reader"), make_user(db.session, "author")
+        follow(reader, author)
+    client = replica_app.test_client()
+    log_in(client, reader)
+
+    # unfollow only runs Core DELETE/UPDATE statements, never an ORM flush
+    assert client.post(f"/unfollow/{author}").status_code == 302
+    assert client.get_cookie("read_primary_until") is not None
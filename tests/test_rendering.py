@@ -0,0 +1,26 @@
+import sqlite3
+
+def test_backfill_stores_missing_renderings(app, tmp_path):
+    with sqlite3.connect(tmp_path / "blog.db") as conn:
+        conn.execute("INSERT INTO user (id, name, email, follower_count) VALUES (1, 'a', 'a@example.com', 0)")
+        for title in ("first", "second", "third"):
+            conn.execute("INSERT INTO post (title, content, excerpt, timestamp, updated_at, user_id, is_public, "
+                         "comment_count, view_count) VALUES (?, '*hi*', 'hi', '2024-01-01 00:00:00', "
+                         "'2024-01-01 00:00:00', 1, 1, 0, 0)", (title,))
+        conn.execute("INSERT INTO comment (content, timestamp, updated_at, user_id, post_id, reply_count) "
+                     "VALUES ('<script>x</script> **yo**', '2024-01-01 00:00:00', '2024-01-01 00:00:00', 1, 1, 0)")
+
+    result = app.test_cli_runner().invoke(args=["markdown", "backfill", "--batch-size", "2"])
+    assert result.exit_code == 0, result.output
+    assert "Rendered 3 post row(s)." in result.output and "Rendered 1 comment row(s)." in result.output
+
+    with sqlite3.connect(tmp_path / "blog.db") as conn:
+        posts = conn.execute("SELECT content_html, content_hash, updated_at FROM post").fetchall()
+        comment_html, = conn.execute("SELECT content_html FROM comment").fetchone()
+    assert {(html, updated_at) for html, _, updated_at in posts} == {("<p><em>hi</em></p>", "2024-01-01 00:00:00")}
+    assert all(key for _, key, _ in posts)
+    assert "<script>" not in comment_html and "<strong>yo</strong>" in comment_html
+
+    # Nothing left to do on a second run
+    result = app.test_cli_runner().invoke(args=["markdown", "backfill"])
+    assert "Rendered 0 post row(s)." in result.output
@@ -0,0 +1,27 @@
+import pytest
+from conftest import make_user
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    return make_app(SESSION_STORE="sqlite", SESSION_SQLITE_PATH=str(tmp_path / "sessions.sqlite3"))
+
+def session_cookie(client):
+    return client.get_cookie("session").value
+
+def test_login_issues_a_new_session_id(app, client):
+    from extensions import db, hasher
+    with app.app_context():
+        make_user(db.session, "member", password=hasher.generate_password_hash("secret"))
+
+    # The "please log in" flash is stored, so the anonymous session gets an id
+    assert client.get("/my-posts").status_code == 302
+    before = session_cookie(client)
+    client.post("/auth/login", data={"email": "member@example.com", "password": "secret"})
+    after = session_cookie(client)
+    assert after != before
+    assert client.get("/my-posts").status_code == 200
+
+    # The pre-login id was dropped from the store, not promoted
+    planted = app.test_client()
+    planted.set_cookie("session", before)
+    assert planted.get("/my-posts").status_code == 302
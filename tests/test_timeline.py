@@ -0,0 +1,77 @@
+import json
+from conftest import auth_headers, log_in, make_user
+
+def feed(client, app, user_id):
+    response = client.get("/api/feed", headers=auth_headers(app, user_id))
+    return [post["title"] for post in response.get_json()["posts"]]
+
+def test_repeated_follow_counts_once(app):
+    from blog.timeline import follow
+    from extensions import db
+    from models import Follow, User
+    with app.app_context():
+        reader, author = make_user(db.session, "reader"), make_user(db.session, "author")
+        # A follow committed by another request between our check and insert
+        db.session.add(Follow(follower_id=reader, followed_id=author))
+        db.session.commit()
+        assert follow(reader, author) is False
+        assert db.session.get(User, author).follower_count == 0
+
+        assert follow(author, reader) is True
+        assert follow(author, reader) is False
+        assert db.session.get(User, reader).follower_count == 1
+
+def test_posts_made_public_reach_followers(app, client):
+    from blog.timeline import follow
+    from extensions import db
+    from models import Post
+    with app.app_context():
+        reader, author = make_user(db.session, "reader"), make_user(db.session, "author")
+        follow(reader, author)
+        drafts = [Post(title=title, content="x", user_id=author, is_public=False) for title in ("form", "api")]
+        db.session.add_all(drafts)
+        db.session.commit()
+        form, api = (post.id for post in drafts)
+    assert feed(client, app, reader) == []
+
+    log_in(client, author)
+    client.post(f"/edit/{form}", data={"title": "form", "content": "x", "is_public": "on"})
+    response = client.put(f"/api/posts/{api}", json={"is_public": True}, headers=auth_headers(app, author))
+    assert response.status_code == 200
+    assert sorted(feed(client, app, reader)) == ["api", "form"]
+
+    # Private and back again: still listed once
+    client.put(f"/api/posts/{api}", json={"is_public": False}, headers=auth_headers(app, author))
+    client.put(f"/api/posts/{api}", json={"is_public": True}, headers=auth_headers(app, author))
+    assert sorted(feed(client, app, reader)) == ["api", "form"]
+
+def test_imported_posts_reach_followers(app, client):
+    from blog.bulk import import_posts
+    from blog.timeline import follow
+    from extensions import db
+    with app.app_context():
+        reader, author = make_user(db.session, "reader"), make_user(db.session, "author")
+        follow(reader, author)
+        lines = [json.dumps({"title": title, "content": "x", "is_public": title == "shared"}) + "\n"
+                 for title in ("shared", "draft")]
+        assert import_posts(lines, user_id=author).imported == 2
+    assert feed(client, app, reader) == ["shared"]
+    assert feed(client, app, author) == ["shared"]
+
+def test_api_delete_removes_the_post_from_timelines(app, client):
+    from blog.timeline import follow
+    from extensions import db
+    with app.app_context():
+        reader, author = make_user(db.session, "reader"), make_user(db.session, "author")
+        follow(reader, author)
+    headers = auth_headers(app, author)
+    post_id = client.post("/api/posts", json={"title": "gone", "content": "x"}, headers=headers).get_json()["post"]["id"]
+    assert feed(client, app, reader) == ["gone"]
+
+    assert client.delete(f"/api/posts/{post_id}", headers=auth_headers(app, reader)).status_code == 403
+    assert client.delete(f"/api/posts/{post_id}", headers=headers).status_code == 200
+    assert feed(client, app, reader) == []
+    assert client.get("/api/search?q=gone").get_json()["results"] == []
+    from models import TimelineEntry
+    with app.app_context():
+        assert db.session.query(TimelineEntry).filter_by(post_id=post_id).count() == 0
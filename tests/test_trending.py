@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+import pytest
+from conftest import make_user
+
+@pytest.fixture
+def posts(app):
+    from extensions import db
+    from models import Post
+    with app.app_context():
+        author = make_user(db.session, "author")
+        posts = [Post(title=title, content="x", user_id=author) for title in ("old", "new", "hidden")]
+        posts[2].is_public = False
+        db.session.add_all(posts)
+        db.session.commit()
+        return [post.id for post in posts]
+
+def ranking(client):
+    return [(post["title"], post["view_count"], post["trending_score"])
+            for post in client.get("/api/posts/trending").get_json()["posts"]]
+
+def test_flushed_views_accumulate(app, client, posts):
+    from extensions import view_counter
+    old, new, hidden = posts
+    for post_id in (old, old, new, hidden):
+        view_counter.record(post_id)
+    view_counter.flush()
+    view_counter.record(new)
+    view_counter.record(new)
+    view_counter.flush()
+    # Private posts are counted but never listed
+    assert [(title, views) for title, views, _ in ranking(client)] == [("new", 3), ("old", 2)]
+    assert [score for *_, score in ranking(client)] == pytest.approx([3, 2], abs=0.01)
+
+def test_older_views_decay(app, client, posts):
+    from blog.trending import record_views
+    from extensions import db
+    old, new, _ = posts
+    half_life = timedelta(hours=app.config["TRENDING_HALF_LIFE_HOURS"])
+    with app.app_context():
+        now = datetime.utcnow()
+        record_views({old: 8}, now - 2 * half_life)
+        record_views({old: 2, new: 3}, now)
+        db.session.commit()
+    # 8 views two half-lives ago count as 2
+    assert [(title, score) for title, _, score in ranking(client)] == [("old", pytest.approx(4, abs=0.01)),
+                                                                       ("new", pytest.approx(3, abs=0.01))]
+
+def test_posts_leave_after_the_window(app, client, posts):
+    from blog.trending import record_views
+    from extensions import db
+    old, new, _ = posts
+    with app.app_context():
+        now = datetime.utcnow()
+        record_views({old: 1000}, now - timedelta(hours=app.config["TRENDING_WINDOW_HOURS"] + 1))
+        record_views({new: 1}, now)
+        db.session.commit()
+    assert [title for title, *_ in ranking(client)] == ["new"]
@@ -0,0 +1,176 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindBuffer:
+    """Collects writes in memory and applies them in one batch per interval.
+
+    A daemon thread per worker process calls flush() every `interval`
+    seconds and once more at exit. Subclasses decide how two pending values
+    for the same key combine (_merge) and how a batch is written (_write).
+    """
+
+    description = "buffered writes"
+
+    def __init__(self):
+        self.app = None
+        self.interval = 10
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _merge(self, key, value):
+        raise NotImplementedError
+
+    def _write(self, pending):
+        raise NotImplementedError
+
+    def _add(self, key, value):
+        with self._lock:
+            self._merge(key, value)
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        # One thread per process; forked workers start their own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name=self.description.replace(" ", "-"), daemon=True).start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing %s failed", self.description)
+
+    def flush(self):
+        """Write everything pending; on failure it is kept for the next attempt"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            with self.app.app_context():
+                self._write(pending)
+        except Exception:
+            with self._lock:
+                for key, value in pending.items():
+                    self._merge(key, value)
+            raise
+        return len(pending)
+
+class LastLoginBuffer(WriteBehindBuffer):
+    """Coalesces User.last_login writes into one batched UPDATE per interval.
+
+    record() only touches memory; the newest timestamp per user is flushed
+    every LAST_LOGIN_FLUSH_INTERVAL seconds. A crash loses at most one
+    interval of login times. With LAST_LOGIN_WRITE_BEHIND off, record()
+    updates and commits the row immediately, as before.
+    """
+
+    description = "last_login updates"
+
+    def __init__(self):
+        super().__init__()
+        self.write_behind = False
+
+    def init_app(self, app):
+        self.app = app
+        self.write_behind = app.config.get("LAST_LOGIN_WRITE_BEHIND", True)
+        self.interval = app.config.get("LAST_LOGIN_FLUSH_INTERVAL", 10)
+        app.extensions["last_logins"] = self
+
+    def record(self, user, when=None):
+        """Note a successful login, after the login's own changes are committed"""
+        when = when or datetime.utcnow()
+        if not self.write_behind:
+            from extensions import db
+            user.last_login = when
+            db.session.commit()
+            return
+        # Keep the in-memory object current without marking it dirty
+        set_committed_value(user, "last_login", when)
+        self._add(user.id, when)
+
+    def _merge(self, user_id, when):
+        if self._pending.get(user_id, datetime.min) < when:
+            self._pending[user_id] = when
+
+    def _write(self, pending):
+        from extensions import db, user_cache
+        from models import User
+        table = User.__table__
+        stmt = (update(table)
+                .where(table.c.id == bindparam("uid"))
+                # Never move last_login backwards if another worker flushed a newer login
+                .where(or_(table.c.last_login.is_(None), table.c.last_login < bindparam("ts")))
+                .values(last_login=bindparam("ts")))
+        db.session.execute(stmt, [{"uid": uid, "ts": ts} for uid, ts in pending.items()])
+        db.session.commit()
+        # Core UPDATEs bypass the ORM events that normally evict cached users
+        user_cache.invalidate(*pending)
+
+class ViewCounter(WriteBehindBuffer):
+    """Per-worker post view counts, added to the database once per interval.
+
+    Each flush adds the deltas to Post.view_count and folds them into the
+    posts' decayed PostTrendingScore rows, which the trending page reads.
+    Hot posts cost one row update per flush instead of one per view; a crash
+    loses at most one interval of views.
+    """
+
+    description = "view counts"
+
+    def __init__(self):
+        super().__init__()
+        self.window = timedelta(hours=48)
+        self._pruned_hour = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get("VIEW_FLUSH_INTERVAL", 10)
+        self.window = timedelta(hours=app.config.get("TRENDING_WINDOW_HOURS", 48))
+        app.extensions["view_counter"] = self
+
+    def record(self, post_id):
+        self._add(post_id, 1)
+
+    def _merge(self, post_id, views):
+        self._pending[post_id] = self._pending.get(post_id, 0) + views
+
+    def _write(self, pending):
+        from blog.trending import prune_scores, record_views
+        from extensions import db
+        from models import Post
+        post = Post.__table__
+        now = datetime.utcnow()
+        # Views of posts deleted since would fail the score foreign key
+        existing = set(db.session.scalars(select(post.c.id).where(post.c.id.in_(pending))))
+        pending = {post_id: views for post_id, views in pending.items() if post_id in existing}
+        if not pending:
+            return
+        rows = [{"pid": post_id, "views": views} for post_id, views in pending.items()]
+
+        # Keep updated_at: a view is not an edit and must not change ETags
+        db.session.execute(update(post).where(post.c.id == bindparam("pid"))
+                           .values(view_count=post.c.view_count + bindparam("views"),
+                                   updated_at=post.c.updated_at), rows)
+        record_views(pending, now)
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        if self._pruned_hour != hour:
+            prune_scores(now - self.window)
+            self._pruned_hour = hour
+        db.session.commit()